@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from pydantic import SecretStr
+from pydantic import Field, SecretStr
 
 
 class Settings(BaseSettings):
@@ -11,6 +11,22 @@ class Settings(BaseSettings):
     # Discord
     discord_bot_token: SecretStr
     discord_channel_id: int
+    discord_queue_size: int = 100  # Demandes de notation en attente côté bot
+    # Rate limit plus long : discord.RateLimited, l'envoi est reprogrammé par l'outbox.
+    # discord.py ramène toute valeur sous 30 s à 30 s, d'où le minimum
+    discord_max_ratelimit_wait: float = Field(30.0, ge=30)
+    rating_view_ttl_hours: int = 24  # Durée pendant laquelle on peut noter
+    rating_queue_size: int = 500  # Notes en attente d'écriture côté bot
+    rating_batch_size: int = 50  # Notes écrites par transaction
+    rating_batch_wait_seconds: float = 0.5  # Attente max pour compléter un lot
+
+    # Outbox des notifications
+    outbox_poll_seconds: float = 10
+    outbox_batch_size: int = 20
+    outbox_max_attempts: int = 10
+    outbox_retry_base_seconds: float = 30
+    notification_debounce_minutes: int = 60  # Épisodes d'une même série regroupés dans un message
+    notification_debounce_max_minutes: int = 240
 
     # Database
     db_host: str = "127.0.0.1"
@@ -19,11 +35,48 @@ class Settings(BaseSettings):
     db_user: str = "giorgio"
     db_password: SecretStr
     db_root_password: SecretStr
+    db_executor_workers: int = 5  # Threads pour les appels BDD depuis l'event loop (<= pool_size + overflow)
+    db_pool_size: int = 10  # Connexions gardées ouvertes
+    db_max_overflow: int = 5  # Connexions temporaires en plus du pool
+    db_pool_timeout: float = 10  # Attente max d'une connexion libre (secondes)
+    db_pool_recycle_seconds: int = 1800  # Sous le wait_timeout de MariaDB
+    db_pool_pre_ping: bool = True  # Vérifie la connexion au checkout
+
+    # File d'ingestion du webhook
+    ingest_queue_size: int = 1000
+    ingest_batch_size: int = 50  # Visionnages écrits par transaction
+    ingest_max_wait_seconds: float = 0.2  # Attente max pour compléter un lot
+    ingest_retry_max_seconds: float = 30  # Délai max entre deux tentatives quand la BDD est indisponible
+
+    # Élection du leader (bot Discord + sync) entre workers / replicas
+    leader_lock_name: str = "giorgio:leader"
+    leader_check_seconds: float = 15
+
+    # Déduplication des webhooks
+    webhook_dedupe_window_seconds: int = 300
+    webhook_dedupe_max_entries: int = 10000
+
+    # Suggestions (filtrage item-item sur les films)
+    recommender_top_k: int = 30  # Voisins gardés par film
+    recommender_rating_weight: float = 0.7  # Part des notes face aux genres dans la similarité
+    recommender_refresh_seconds: int = 60  # Vérification du besoin de reconstruire le modèle
+    recommender_suggestions: int = 3
+
+    # Cache des stats
+    stats_cache_ttl_seconds: float = 300
+    stats_cache_max_entries: int = 256
 
     # Jellyfin
     jellyfin_url: str
     jellyfin_api_key: SecretStr
     sync_interval_hours: int = 6
+    full_sync_interval_hours: int = 168  # Sync complet hebdo (détecte les suppressions)
+    sync_batch_size: int = 500  # Contenus écrits par transaction lors du sync
+    sync_page_size: int = 500  # Items demandés par page à /Items
+    sync_page_concurrency: int = 3  # Pages téléchargées en parallèle
+    sync_page_retries: int = 3
+    sync_page_timeout: float = 30.0
+    sync_max_delete_ratio: float = 0.2  # Au-delà, le sync complet refuse de soft-delete
 
     @property
     def database_url(self) -> str:
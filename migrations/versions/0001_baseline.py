@@ -0,0 +1,71 @@
+"""baseline: schéma historique créé par create_all
+
+Les bases existantes ont été créées par Base.metadata.create_all : chaque
+étape vérifie donc ce qui existe déjà avant d'agir.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("jellyfin_id", sa.String(36), primary_key=True),
+            sa.Column("username", sa.String(100), nullable=False),
+            sa.Column("discord_id", sa.String(20), nullable=True),
+        )
+    
+    if "contents" not in tables:
+        op.create_table(
+            "contents",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("title", sa.String(255), nullable=False),
+            sa.Column("type", sa.String(20), nullable=False),
+            sa.Column("year", sa.Integer(), nullable=True),
+            sa.Column("genres", sa.JSON(), nullable=True),
+            sa.Column("tmdb_id", sa.String(20), nullable=True),
+            sa.Column("length", sa.Integer(), nullable=True),
+            sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        )
+    elif "deleted_at" not in {c["name"] for c in inspector.get_columns("contents")}:
+        op.add_column("contents", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    
+    if "watchlogs" not in tables:
+        op.create_table(
+            "watchlogs",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("user_id", sa.String(36), sa.ForeignKey("users.jellyfin_id"), nullable=False),
+            sa.Column("content_id", sa.String(36), sa.ForeignKey("contents.id"), nullable=False),
+            sa.Column("rating", sa.Integer(), nullable=True),
+            sa.Column("watched_at", sa.DateTime(), nullable=True),
+            sa.Column("rated_at", sa.DateTime(), nullable=True),
+        )
+    
+    if "sync_state" not in tables:
+        op.create_table(
+            "sync_state",
+            sa.Column("item_type", sa.String(20), primary_key=True),
+            sa.Column("last_sync_at", sa.DateTime(), nullable=True),
+            sa.Column("last_full_sync_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table("sync_state")
+    op.drop_table("watchlogs")
+    op.drop_table("contents")
+    op.drop_table("users")
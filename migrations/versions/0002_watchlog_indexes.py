@@ -0,0 +1,39 @@
+"""index composites pour les chemins chauds des watchlogs et du catalogue
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:05:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_watchlogs_user_content_watched", "watchlogs", ["user_id", "content_id", "watched_at"]),
+    ("ix_watchlogs_watched_at", "watchlogs", ["watched_at"]),
+    ("ix_watchlogs_content_rating", "watchlogs", ["content_id", "rating"]),
+    ("ix_contents_type_deleted", "contents", ["type", "deleted_at"]),
+]
+
+
+def _existing_indexes(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        # Déjà présent si la table vient d'être créée par create_all
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,45 @@
+"""content_stats : agrégats par contenu maintenus à l'écriture
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:10:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "content_stats" not in inspector.get_table_names():
+        op.create_table(
+            "content_stats",
+            sa.Column("content_id", sa.String(36), sa.ForeignKey("contents.id"), primary_key=True),
+            sa.Column("watch_count", sa.Integer(), nullable=False),
+            sa.Column("rating_count", sa.Integer(), nullable=False),
+            sa.Column("rating_sum", sa.Integer(), nullable=False),
+            sa.Column("avg_rating", sa.Float(), nullable=True),
+            sa.Column("last_watched_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_content_stats_watch_count", "content_stats", ["watch_count"])
+        op.create_index("ix_content_stats_avg_rating", "content_stats", ["avg_rating", "rating_count"])
+    
+    # Backfill depuis l'historique (la table peut déjà avoir été créée vide par create_all)
+    op.execute("DELETE FROM content_stats")
+    op.execute(
+        """
+        INSERT INTO content_stats (content_id, watch_count, rating_count, rating_sum, avg_rating, last_watched_at)
+        SELECT content_id, COUNT(id), COUNT(rating), COALESCE(SUM(rating), 0), AVG(rating), MAX(watched_at)
+        FROM watchlogs
+        GROUP BY content_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("content_stats")
@@ -0,0 +1,42 @@
+"""notification_outbox : demandes de notation Discord persistantes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:15:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "notification_outbox" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("watchlog_id", sa.Integer(), sa.ForeignKey("watchlogs.id"), nullable=False, unique=True),
+        sa.Column("user_id", sa.String(36), nullable=False),
+        sa.Column("username", sa.String(100), nullable=False),
+        sa.Column("content_id", sa.String(36), nullable=False),
+        sa.Column("content_name", sa.String(255), nullable=False),
+        sa.Column("content_type", sa.String(20), nullable=False),
+        sa.Column("status", sa.String(10), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.String(255), nullable=True),
+        sa.Column("message_id", sa.String(20), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_outbox_status_next_attempt", "notification_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade():
+    op.drop_table("notification_outbox")
@@ -0,0 +1,24 @@
+"""notification_outbox.series_name : regroupement des épisodes en binge
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 10:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("notification_outbox")}
+    if "series_name" not in columns:
+        op.add_column("notification_outbox", sa.Column("series_name", sa.String(255), nullable=True))
+
+
+def downgrade():
+    op.drop_column("notification_outbox", "series_name")
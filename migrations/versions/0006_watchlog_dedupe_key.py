@@ -0,0 +1,28 @@
+"""watchlogs.dedupe_key : idempotence des webhooks PlaybackStop
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 10:25:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "dedupe_key" not in {c["name"] for c in inspector.get_columns("watchlogs")}:
+        op.add_column("watchlogs", sa.Column("dedupe_key", sa.String(40), nullable=True))
+    if "uq_watchlogs_dedupe_key" not in {i["name"] for i in inspector.get_indexes("watchlogs")}:
+        # Les watchlogs existants gardent une clé NULL : pas de conflit possible
+        op.create_index("uq_watchlogs_dedupe_key", "watchlogs", ["dedupe_key"], unique=True)
+
+
+def downgrade():
+    op.drop_index("uq_watchlogs_dedupe_key", table_name="watchlogs")
+    op.drop_column("watchlogs", "dedupe_key")
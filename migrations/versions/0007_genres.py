@@ -0,0 +1,66 @@
+"""genres / content_genres : index normalisé de contents.genres
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 10:40:00
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+    if "genres" not in tables:
+        op.create_table(
+            "genres",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("name", sa.String(100), nullable=False),
+        )
+        op.create_index("uq_genres_name", "genres", ["name"], unique=True)
+    if "content_genres" not in tables:
+        op.create_table(
+            "content_genres",
+            sa.Column("content_id", sa.String(36), sa.ForeignKey("contents.id"), primary_key=True),
+            sa.Column("genre_id", sa.Integer(), sa.ForeignKey("genres.id"), primary_key=True),
+        )
+        op.create_index("ix_content_genres_genre", "content_genres", ["genre_id", "content_id"])
+    
+    # Backfill depuis la colonne JSON (la table peut déjà avoir été créée vide par create_all)
+    if bind.execute(sa.text("SELECT 1 FROM content_genres LIMIT 1")).first():
+        return
+    
+    links = set()
+    for content_id, genres in bind.execute(sa.text("SELECT id, genres FROM contents WHERE genres IS NOT NULL")):
+        if isinstance(genres, str):
+            genres = json.loads(genres)
+        for name in genres or []:
+            if name.strip():
+                links.add((content_id, name.strip()))
+    if not links:
+        return
+    
+    names = {name for _, name in links}
+    bind.execute(sa.text("INSERT IGNORE INTO genres (name) VALUES (:name)"), [{"name": name} for name in names])
+    # Collation utf8mb4_general_ci (casse et accents ignorés) : "Comédie" et "comedie" partagent une ligne.
+    # Les noms sans correspondance exacte sont recherchés par MariaDB elle-même, avec cette collation
+    genre_ids = {name: genre_id for genre_id, name in bind.execute(sa.text("SELECT id, name FROM genres"))}
+    for name in names - set(genre_ids):
+        genre_ids[name] = bind.execute(sa.text("SELECT id FROM genres WHERE name = :name"), {"name": name}).scalar()
+    bind.execute(
+        sa.text("INSERT IGNORE INTO content_genres (content_id, genre_id) VALUES (:content_id, :genre_id)"),
+        [{"content_id": content_id, "genre_id": genre_ids[name]} for content_id, name in links]
+    )
+
+
+def downgrade():
+    op.drop_table("content_genres")
+    op.drop_table("genres")
@@ -0,0 +1,24 @@
+"""index (user_id, watched_at) pour l'historique paginé par utilisateur
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 10:55:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Déjà présent si la table vient d'être créée par create_all
+    if "ix_watchlogs_user_watched" not in {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("watchlogs")}:
+        op.create_index("ix_watchlogs_user_watched", "watchlogs", ["user_id", "watched_at"])
+
+
+def downgrade():
+    op.drop_index("ix_watchlogs_user_watched", table_name="watchlogs")
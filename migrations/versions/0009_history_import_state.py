@@ -0,0 +1,34 @@
+"""history_import_state : checkpoints de l'import de l'historique Jellyfin
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 11:10:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "history_import_state" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "history_import_state",
+        sa.Column("user_id", sa.String(36), primary_key=True),
+        sa.Column("item_type", sa.String(20), primary_key=True),
+        sa.Column("next_index", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=True),
+        sa.Column("imported", sa.Integer(), nullable=False),
+        sa.Column("skipped", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("history_import_state")
@@ -0,0 +1,29 @@
+"""content_stats.avg_rating : recalcul depuis rating_sum / rating_count
+
+Les notes appliquaient leur delta deux fois au calcul de la moyenne ;
+rating_count et rating_sum sont justes, seule avg_rating est à réparer.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 14:00:00
+"""
+from alembic import op
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        UPDATE content_stats
+        SET avg_rating = CASE WHEN rating_count > 0 THEN rating_sum / rating_count ELSE NULL END
+        """
+    )
+
+
+def downgrade():
+    pass
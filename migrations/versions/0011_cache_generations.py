@@ -0,0 +1,28 @@
+"""cache_generations : invalidation du cache des stats commune aux workers
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 14:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "cache_generations" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "cache_generations",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("generation", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("cache_generations")
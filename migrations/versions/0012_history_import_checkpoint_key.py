@@ -0,0 +1,28 @@
+"""history_import_state : checkpoint sur la clé de tri (DateCreated, Id) plutôt qu'un offset seul
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 16:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("history_import_state")}
+    # Les checkpoints existants gardent une clé NULL : la reprise refait leur dernière page
+    if "last_created_at" not in columns:
+        op.add_column("history_import_state", sa.Column("last_created_at", sa.DateTime(), nullable=True))
+    if "last_item_id" not in columns:
+        op.add_column("history_import_state", sa.Column("last_item_id", sa.String(36), nullable=True))
+
+
+def downgrade():
+    op.drop_column("history_import_state", "last_item_id")
+    op.drop_column("history_import_state", "last_created_at")
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark du parsing des webhooks Jellyfin, sur les payloads webhook_*.json du dépôt.
+
+    python scripts/bench_webhook_parse.py [-n 20000]
+
+Compare l'ancien chemin (json.loads + JellyfinWebhook complet pour tout event)
+au chemin rapide (orjson + lecture de NotificationType, modèle seulement si traité).
+Les échantillons sont rejoués tels quels (PlaybackStop, traité) et avec un type non traité.
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.schemas.jellyfin import JellyfinWebhook, parse_webhook
+
+HANDLED = {"PlaybackStop"}
+UNHANDLED_TYPE = "PlaybackProgress"
+
+
+def parse_before(body: bytes):
+    """Chemin historique : tout est décodé et validé avant le dispatch"""
+    payload = JellyfinWebhook(**json.loads(body))
+    return payload.NotificationType, payload
+
+
+def parse_after(body: bytes):
+    return parse_webhook(body, HANDLED)
+
+
+def load_samples() -> list[tuple[str, bytes]]:
+    samples = []
+    for path in sorted(ROOT.glob("webhook_*.json")):
+        body = path.read_bytes()
+        samples.append((path.name, body))
+        
+        raw = json.loads(body)
+        raw["NotificationType"] = UNHANDLED_TYPE
+        samples.append((f"{path.name} ({UNHANDLED_TYPE})", json.dumps(raw).encode()))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark webhook parsing")
+    parser.add_argument("-n", "--number", type=int, default=20000, help="Parses par mesure")
+    args = parser.parse_args()
+    
+    samples = load_samples()
+    if not samples:
+        sys.exit("No webhook_*.json sample found")
+    
+    print(f"{'sample':<45} {'bytes':>6} {'before µs':>10} {'after µs':>10} {'speedup':>8}")
+    for name, body in samples:
+        # Meilleur de 5 mesures pour limiter le bruit
+        before = min(timeit.repeat(lambda: parse_before(body), number=args.number, repeat=5)) / args.number
+        after = min(timeit.repeat(lambda: parse_after(body), number=args.number, repeat=5)) / args.number
+        print(f"{name:<45} {len(body):>6} {before * 1e6:>10.2f} {after * 1e6:>10.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Literal, Optional
+import csv
+import io
+import orjson
+
+from src.services import history_service
+from src.services.db_executor import run_db
+
+router = APIRouter()
+
+# Lignes lues par page lors d'un export
+EXPORT_CHUNK_SIZE = 1000
+
+
+@router.get("")
+async def history(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    user_id: Optional[str] = None,
+    type: Optional[Literal["movie", "episode"]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Historique des visionnages, du plus récent au plus ancien ; passer next_cursor pour la page suivante"""
+    try:
+        return await run_db(
+            history_service.get_history_page,
+            limit,
+            cursor=cursor,
+            user_id=user_id,
+            content_type=type,
+            since=since,
+            until=until
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _to_ndjson(rows: list[dict]) -> bytes:
+    return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+
+def _to_csv(rows: list[dict]) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=history_service.HISTORY_COLUMNS)
+    writer.writerows({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row.items()
+    } for row in rows)
+    return buffer.getvalue()
+
+
+@router.get("/export")
+async def export_history(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user_id: Optional[str] = None,
+    type: Optional[Literal["movie", "episode"]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Export complet de l'historique filtré, streamé page par page (mémoire constante).
+    Chaque page est une requête keyset courte dans le pool BDD : un téléchargement lent
+    ne garde ni connexion ni transaction ouverte.
+    """
+    async def body():
+        if format == "csv":
+            yield ",".join(history_service.HISTORY_COLUMNS) + "\r\n"
+        cursor = None
+        while True:
+            page = await run_db(
+                history_service.get_history_page,
+                EXPORT_CHUNK_SIZE,
+                cursor=cursor,
+                user_id=user_id,
+                content_type=type,
+                since=since,
+                until=until
+            )
+            if page["items"]:
+                yield _to_csv(page["items"]) if format == "csv" else _to_ndjson(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"giorgio-history.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
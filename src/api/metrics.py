@@ -0,0 +1,50 @@
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+from src.bot.discord_bot import get_bridge_metrics
+from src.models.database import engine
+from src.services.cache import stats_cache, stats_generation
+from src.services.ingest import ingest_queue
+from src.services.leader import leader
+from src.services.metrics import SnapshotCollector
+from src.services.recommender import recommender
+
+router = APIRouter()
+prometheus_router = APIRouter()
+
+# Sections du snapshot JSON, aussi exportées dans /metrics
+SNAPSHOTS = {
+    "db_pool": lambda: engine.pool.snapshot(),
+    "stats_cache": stats_cache.stats,
+    "stats_generation": stats_generation.stats,
+    "discord": get_bridge_metrics,
+    "ingest": ingest_queue.stats,
+    "recommender": recommender.stats,
+    "leader": leader.stats
+}
+
+# Plusieurs workers (uvicorn --workers) : les histogrammes et compteurs de chaque process sont
+# écrits dans PROMETHEUS_MULTIPROC_DIR et agrégés ; les snapshots, propres au worker qui répond, portent son pid
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+if MULTIPROCESS:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(SnapshotCollector(SNAPSHOTS, labels={"pid": str(os.getpid())}))
+else:
+    registry = REGISTRY
+    registry.register(SnapshotCollector(SNAPSHOTS))
+
+
+@router.get("")
+async def metrics():
+    """Compteurs internes pour le monitoring"""
+    return {section: source() for section, source in SNAPSHOTS.items()}
+
+
+@prometheus_router.get("/metrics")
+async def prometheus_metrics():
+    """Exposition au format Prometheus (histogrammes + snapshots)"""
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -1,39 +1,98 @@
-from fastapi import APIRouter, HTTPException
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from typing import Callable, Optional
+import hashlib
+import json
 
 from src.services import stats_service
+from src.services.cache import stats_cache, stats_generation
+from src.services.db_executor import run_db
 
 router = APIRouter()
 
+# Les clients revalident à chaque fois (ETag → 304), le serveur sert depuis son cache
+CACHE_CONTROL = "no-cache"
+
+
+class CachedResponse:
+    """Réponse JSON sérialisée une fois, avec son ETag"""
+    
+    def __init__(self, data):
+        self.body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode()
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+async def _cached(request: Request, key: tuple, producer: Callable, *args, **kwargs) -> Optional[Response]:
+    """Sert key depuis le cache, ou calcule via producer ; None si producer ne trouve rien"""
+    # Une écriture traitée par un autre worker invalide aussi ce cache local
+    await run_db(stats_generation.check)
+    cached = stats_cache.get(key)
+    if cached is None:
+        generation = stats_cache.generation
+        data = await run_db(producer, *args, **kwargs)
+        if data is None:
+            return None
+        cached = CachedResponse(data)
+        stats_cache.set(key, cached, generation=generation)
+    
+    headers = {"ETag": cached.etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
 
 @router.get("/")
-async def global_stats():
+async def global_stats(request: Request):
     """Statistiques globales de Giorgio"""
-    return stats_service.get_global_stats()
+    return await _cached(request, ("global",), stats_service.get_global_stats)
 
 
 @router.get("/most-watched")
-async def most_watched(limit: int = 10):
+async def most_watched(request: Request, limit: int = 10):
     """Top des contenus les plus vus"""
-    return stats_service.get_most_watched(limit=limit)
+    return await _cached(request, ("most_watched", limit), stats_service.get_most_watched, limit=limit)
 
 
 @router.get("/top-rated")
-async def top_rated(limit: int = 10, min_ratings: int = 1):
+async def top_rated(request: Request, limit: int = 10, min_ratings: int = 1):
     """Top des contenus les mieux notés"""
-    return stats_service.get_top_rated(limit=limit, min_ratings=min_ratings)
+    return await _cached(request, ("top_rated", limit, min_ratings), stats_service.get_top_rated, limit=limit, min_ratings=min_ratings)
 
 
 @router.get("/recent")
-async def recent_activity(limit: int = 10):
+async def recent_activity(request: Request, limit: int = 10):
     """Activité récente"""
-    return stats_service.get_recent_activity(limit=limit)
+    return await _cached(request, ("recent", limit), stats_service.get_recent_activity, limit=limit)
+
+
+@router.get("/genres")
+async def genre_stats(request: Request):
+    """Visionnages et note moyenne par genre"""
+    return await _cached(request, ("genres",), stats_service.get_genre_stats)
+
+
+@router.get("/user/{user_id}/genres")
+async def user_genre_stats(request: Request, user_id: str):
+    """Genres regardés par un utilisateur"""
+    # Clé ("user", id, ...) : invalidée avec les autres stats de cet utilisateur
+    response = await _cached(request, ("user", user_id, "genres"), stats_service.get_user_genre_stats, user_id)
+    if response is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return response
 
 
 @router.get("/user/{user_id}")
-async def user_stats(user_id: str):
+async def user_stats(request: Request, user_id: str):
     """Statistiques d'un utilisateur"""
-    stats = stats_service.get_user_stats(user_id)
-    if not stats:
+    response = await _cached(request, ("user", user_id), stats_service.get_user_stats, user_id)
+    if response is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return stats
\ No newline at end of file
+    return response
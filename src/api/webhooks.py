@@ -1,8 +1,13 @@
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 from pydantic import ValidationError
-from src.schemas.jellyfin import JellyfinWebhook
-from src.bot.discord_bot import notify_rating_request
+from datetime import datetime
+from src.schemas.jellyfin import JellyfinWebhook, parse_webhook
 from src.services import database_service
+from src.services.db_executor import run_db
+from src.services.dedupe import adjacent_dedupe_keys, playback_dedupe_key, recent_events
+from src.services.ingest import ingest_queue
+from src.services.metrics import WEBHOOK_PHASE
 import logging
 import json
 
@@ -26,37 +31,43 @@ async def handle_playback_stop(payload: JellyfinWebhook):
     else:
         content_name = f"{payload.Name} ({payload.Year})"
     
-    logger.info(f"🎉 User {payload.NotificationUsername} finished watching {content_name}")
+    # Doublon récent (retry Jellyfin, sessions multiples) : ignoré avant la BDD et Discord
+    timestamp = payload.UtcTimestamp or payload.Timestamp
+    dedupe_key = playback_dedupe_key(payload.UserId, payload.ItemId, timestamp)
+    adjacent_keys = adjacent_dedupe_keys(payload.UserId, payload.ItemId, timestamp)
+    if recent_events.is_duplicate([dedupe_key, *adjacent_keys]):
+        logger.info(f"🔁 Duplicate PlaybackStop ignored: {payload.NotificationUsername} → {content_name}")
+        return
     
-    # Persiste les données pour TOUS les utilisateurs
-    user = database_service.get_or_create_user(payload.UserId, payload.NotificationUsername)
-    content = database_service.get_or_create_content(
-        content_id=payload.ItemId,
-        title=content_name,
-        content_type=payload.ItemType.lower(),
-        year=payload.Year,
-        genres=payload.get_genres_list(),
-        tmdb_id=payload.Provider_tmdb
-    )
-    watchlog = database_service.create_watchlog(user.jellyfin_id, content.id)
+    logger.info(f"🎉 User {payload.NotificationUsername} finished watching {content_name}")
     
-    # Notification Discord SEULEMENT pour certains utilisateurs
-    if payload.NotificationUsername.lower() in DISCORD_NOTIFICATION_USERS:
-        await notify_rating_request(
-            user_id=payload.UserId,
-            username=payload.NotificationUsername,
-            content_id=payload.ItemId,
-            content_name=content_name,
-            content_type=payload.ItemType,
-            watchlog_id=watchlog.id
-        )
-    else:
-        logger.info(f"📊 Watchlog saved for {payload.NotificationUsername} (no Discord notification)")
+    # Persiste les données pour TOUS les utilisateurs (écrites par lot en tâche de fond),
+    # avec la demande de notation Discord SEULEMENT pour certains utilisateurs
+    # La clé n'est marquée qu'une fois l'event accepté : après un 503, le retry de Jellyfin est écrit
+    accepted = ingest_queue.submit({
+        "user_id": payload.UserId,
+        "username": payload.NotificationUsername,
+        "content_id": payload.ItemId,
+        "title": content_name,
+        "content_type": payload.ItemType.lower(),
+        "year": payload.Year,
+        "genres": payload.get_genres_list(),
+        "tmdb_id": payload.Provider_tmdb,
+        "notify": payload.NotificationUsername.lower() in DISCORD_NOTIFICATION_USERS,
+        "series_name": payload.SeriesName if payload.ItemType == "Episode" else None,
+        "watched_at": datetime.utcnow(),
+        "dedupe_key": dedupe_key,
+        "adjacent_keys": adjacent_keys
+    })
+    if accepted:
+        recent_events.mark(dedupe_key)
+    return accepted
 
 
 async def handle_item_added(payload: JellyfinWebhook):
     """Traite l'ajout d'un nouveau contenu au catalogue"""
-    content = database_service.get_or_create_content(
+    content = await run_db(
+        database_service.get_or_create_content,
         content_id=payload.ItemId,
         title=payload.Name,
         content_type=payload.ItemType.lower(),
@@ -78,8 +89,8 @@ async def jellyfin_webhook(request: Request):
     # Jellyfin envoie du text/plain au lieu de application/json
     try:
         body = await request.body()
-        raw_payload = json.loads(body)
-        payload = JellyfinWebhook(**raw_payload)
+        with WEBHOOK_PHASE.labels("parse").time():
+            event_type, payload = parse_webhook(body, HANDLERS)
     except json.JSONDecodeError as e:
         logger.error(f"❌ Invalid JSON: {e}")
         return {"status": "error", "detail": "Invalid JSON"}
@@ -87,13 +98,16 @@ async def jellyfin_webhook(request: Request):
         logger.error(f"❌ Validation error: {e}")
         return {"status": "error", "detail": str(e)}
     
-    event_type = payload.NotificationType
     handler = HANDLERS.get(event_type)
     
     if handler:
-        await handler(payload)
-        logger.info(f"✅ Handled event: {event_type} for item {payload.Name}")
-        return {"status": "handled"}
+        # Un handler qui retourne False n'a pas pu prendre l'event : Jellyfin réessaiera
+        with WEBHOOK_PHASE.labels("handle").time():
+            accepted = await handler(payload)
+        if accepted is False:
+            return JSONResponse(status_code=503, content={"status": "busy"})
+        logger.info(f"✅ Accepted event: {event_type} for item {payload.Name}")
+        return JSONResponse(status_code=202, content={"status": "accepted"})
     else:
         logger.warning(f"⚠️ Unhandled event type: {event_type}")
         return {"status": "unhandled", "event": event_type}
\ No newline at end of file
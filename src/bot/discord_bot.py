@@ -1,20 +1,52 @@
 import discord
 import logging
 import asyncio
-from discord.ui import View, Button
-from discord import ButtonStyle
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from discord.ui import View, Button, Select
+from discord import ButtonStyle, SelectOption
 from config.settings import settings, SecretStr
+from src.services import outbox_service
+from src.services.db_executor import run_db
+from src.services.metrics import BOT_LATENCY, RATING_LATENCY, WEBHOOK_PHASE
 
 logger = logging.getLogger(__name__)
 
-class RatingView(View):
+class ExpiringView(View):
+    """
+    Vue persistante (timeout=None : ré-attachée au redémarrage, cf. GiorgioBot._restore_rating_views)
+    mais bornée par rating_view_ttl_hours : passé ce délai, un clic est refusé et la vue s'arrête.
+    """
+    
+    def __init__(self, sent_at: Optional[datetime] = None):
+        super().__init__(timeout=None)
+        self.expires_at = (sent_at or datetime.utcnow()) + timedelta(hours=settings.rating_view_ttl_hours)
+    
+    def expired(self) -> bool:
+        return datetime.utcnow() >= self.expires_at
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Appelé par discord.py avant chaque callback : ferme la notation une fois le délai passé"""
+        if not self.expired():
+            return True
+        for child in self.children:
+            child.disabled = True
+        await interaction.response.edit_message(view=self)
+        await interaction.followup.send("⌛ *Troppo tardi!* La notation est fermée pour celui-là.", ephemeral=True)
+        self.stop()
+        return False
+
+
+class RatingView(ExpiringView):
     """
     Vue avec boutons 1-10 pour noter un contenu.
     Giorgio a ses opinions sur chaque note...
     """
     
-    def __init__(self, user_id: str, content_id: str, content_name: str,  watchlog_id: int):
-        super().__init__(timeout=86400)  # 24h pour répondre
+    def __init__(self, user_id: str, content_id: str, content_name: str,  watchlog_id: int, sent_at: Optional[datetime] = None):
+        super().__init__(sent_at)
         self.user_id = user_id
         self.content_id = content_id
         self.content_name = content_name
@@ -26,7 +58,7 @@ class RatingView(View):
             button = Button(
                 label=str(i),
                 style=self._get_button_style(i),
-                custom_id=f"rating_{i}",
+                custom_id=f"rating:{watchlog_id}:{i}",
                 row=0 if i <= 5 else 1
             )
             button.callback = self._create_callback(i)
@@ -46,6 +78,7 @@ class RatingView(View):
     def _create_callback(self, rating: int):
         """Crée le callback pour chaque bouton"""
         async def callback(interaction: discord.Interaction):
+            started = time.perf_counter()
             self.rating = rating
             response = self._get_giorgio_reaction(rating)
             
@@ -58,17 +91,17 @@ class RatingView(View):
                 view=self
             )
             
-            # Sauvegarde la note en BDD
-            from src.services import database_service
-            database_service.update_rating(self.watchlog_id, rating)
-            
-            logger.info(f"⭐ Rating saved: {self.content_name} = {rating}/10")
+            # Écrite par lot hors de la loop du bot (cf. RatingWriter)
+            await interaction.client.ratings.submit(self.watchlog_id, rating)
+            RATING_LATENCY.labels("callback").observe(time.perf_counter() - started)
+            logger.info(f"⭐ Rating queued: {self.content_name} = {rating}/10")
             
             self.stop()
         
         return callback
     
-    def _get_giorgio_reaction(self, rating: int) -> str:
+    @staticmethod
+    def _get_giorgio_reaction(rating: int) -> str:
         """La réaction de Giorgio selon la note — il a des opinions!"""
         reactions = {
             1: "🤮 *Madonna!* Une telle insulte au cinéma... J'espère que tu plaisantes, *caro*.",
@@ -84,6 +117,166 @@ class RatingView(View):
         }
         return reactions.get(rating, "🤔 *Interessante...*")
 
+
+# Discord limite un message à 5 rangées de composants : une liste déroulante par épisode
+MAX_EPISODES_PER_MESSAGE = 5
+
+
+class BatchRatingView(ExpiringView):
+    """
+    Vue pour une session de binge : une liste déroulante 1-10 par épisode,
+    dans un seul message au lieu d'un message (et de dix boutons) par épisode.
+    """
+    
+    def __init__(self, episodes: list[dict], sent_at: Optional[datetime] = None):
+        super().__init__(sent_at)  # Persistante et bornée, comme RatingView
+        self.remaining = {episode["watchlog_id"] for episode in episodes}
+        
+        for row, episode in enumerate(episodes[:MAX_EPISODES_PER_MESSAGE]):
+            select = Select(
+                custom_id=f"rating:{episode['watchlog_id']}",
+                placeholder=f"Note pour {episode['content_name']}"[:150],
+                options=[SelectOption(label=f"{i}/10", value=str(i)) for i in range(1, 11)],
+                row=row
+            )
+            select.callback = self._create_callback(select, episode)
+            self.add_item(select)
+    
+    def _create_callback(self, select: Select, episode: dict):
+        """Crée le callback de la liste déroulante d'un épisode"""
+        async def callback(interaction: discord.Interaction):
+            started = time.perf_counter()
+            rating = int(select.values[0])
+            content_name = episode["content_name"]
+            
+            # Fige la liste de cet épisode, les autres restent notables
+            select.disabled = True
+            select.placeholder = f"✅ {content_name} : {rating}/10"[:150]
+            await interaction.response.edit_message(view=self)
+            await interaction.followup.send(
+                f"✅ **{content_name}** : **{rating}/10**\n\n{RatingView._get_giorgio_reaction(rating)}",
+                ephemeral=True
+            )
+            
+            # Écrite par lot hors de la loop du bot (cf. RatingWriter)
+            await interaction.client.ratings.submit(episode["watchlog_id"], rating)
+            RATING_LATENCY.labels("callback").observe(time.perf_counter() - started)
+            logger.info(f"⭐ Rating queued: {content_name} = {rating}/10")
+            
+            self.remaining.discard(episode["watchlog_id"])
+            if not self.remaining:
+                self.stop()
+        
+        return callback
+
+
+# Temps laissé au writer pour écrire les notes en attente à la fermeture du bot
+RATING_FLUSH_TIMEOUT_SECONDS = 10
+RATING_WRITE_ATTEMPTS = 3
+
+
+class RatingWriter:
+    """
+    Notes cliquées dans Discord, écrites hors des callbacks.
+    Le callback acquitte l'interaction puis dépose la note dans une file bornée (il attend si elle
+    est pleine, sans bloquer la loop) ; un worker de la loop du bot les écrit par lots, une
+    transaction par lot, dans le pool de threads BDD.
+    """
+    
+    def __init__(self, max_size: int, batch_size: int, max_wait_seconds: float):
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        
+        # Métriques
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+    
+    async def submit(self, watchlog_id: int, rating: int):
+        await self.queue.put((time.monotonic(), watchlog_id, rating))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+    
+    async def _next_batch(self) -> list:
+        """Attend une première note, puis complète le lot pendant max_wait_seconds au plus"""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    async def _write(self, batch: list):
+        from src.services import database_service
+        
+        # Plusieurs clics sur le même visionnage : le dernier gagne
+        ratings = {watchlog_id: rating for _, watchlog_id, rating in batch}
+        for attempt in range(1, RATING_WRITE_ATTEMPTS + 1):
+            try:
+                await run_db(database_service.update_ratings, ratings)
+                break
+            except Exception as e:
+                if attempt == RATING_WRITE_ATTEMPTS:
+                    self.failed += len(ratings)
+                    logger.error(f"❌ Failed to save {len(ratings)} rating(s): {e}")
+                    return
+                logger.warning(f"⚠️ Rating batch failed (attempt {attempt}/{RATING_WRITE_ATTEMPTS}): {e}")
+                await asyncio.sleep(2 ** attempt)
+        
+        now = time.monotonic()
+        for enqueued_at, _, _ in batch:
+            RATING_LATENCY.labels("persisted").observe(now - enqueued_at)
+        self.batches += 1
+        self.written += len(ratings)
+    
+    async def flush(self):
+        """Attend l'écriture des notes en attente (fermeture du bot)"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=RATING_FLUSH_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error(f"❌ {self.queue.qsize()} rating(s) not saved before shutdown")
+    
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 2) if self.batches else None
+        }
+
+
+class BridgeMetrics:
+    """Compteurs du pont FastAPI → Discord (lus depuis le thread FastAPI)"""
+    
+    def __init__(self):
+        self.wakeups = 0
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.coalesced = 0  # Notifications livrées dans un message groupé (appels Discord économisés)
+        self.dropped = 0  # File de réveil pleine : la notification reste dans l'outbox
+        self.max_depth = 0
+        self.last_delivery_seconds = None
+        self.expired_views = 0  # Vues de notation arrêtées à la fin de rating_view_ttl_hours
+
+
 class GiorgioBot(discord.Client):
     """
     Giorgio - Un bot italien passionné d'art et de cinéma.
@@ -94,9 +287,29 @@ class GiorgioBot(discord.Client):
     def __init__(self, channel_id: int):
         intents = discord.Intents.default()
         intents.message_content = True  # Pour lire les mentions
-        super().__init__(intents=intents)
+        # Les rate limits de plus de discord_max_ratelimit_wait (30 s minimum) remontent en discord.RateLimited, gérés par l'outbox
+        super().__init__(intents=intents, max_ratelimit_timeout=settings.discord_max_ratelimit_wait)
         self.channel_id = channel_id
         self.notification_channel = None
+        
+        # File bornée de réveils du worker de l'outbox (ids des notifications à envoyer)
+        self.outbox_wakeups: asyncio.Queue = asyncio.Queue(maxsize=settings.discord_queue_size)
+        self.channel_ready = asyncio.Event()
+        self.bridge_metrics = BridgeMetrics()
+        self.ratings = RatingWriter(settings.rating_queue_size, settings.rating_batch_size, settings.rating_batch_wait_seconds)
+        self._views_restored = False
+        # Vues de notation enregistrées, retirées à expiration (cf. _evict_expired_views)
+        self.rating_views: set[ExpiringView] = set()
+    
+    async def setup_hook(self):
+        """Lance les workers de l'outbox et des notes dans la loop du bot, avant la connexion"""
+        self._outbox_task = asyncio.create_task(self._run_outbox_worker())
+        self._ratings_task = asyncio.create_task(self.ratings.run())
+    
+    async def close(self):
+        """Écrit les notes en attente avant de fermer la connexion"""
+        await self.ratings.flush()
+        await super().close()
     
     async def on_ready(self):
         """Quand Giorgio se connecte"""
@@ -104,6 +317,159 @@ class GiorgioBot(discord.Client):
         self.notification_channel = self.get_channel(self.channel_id)
         if not self.notification_channel:
             logger.error(f"❌ Channel {self.channel_id} not found!")
+            return
+        
+        # on_ready est rappelé à chaque reconnexion : les vues ne sont restaurées qu'une fois
+        if not self._views_restored:
+            self._views_restored = True
+            await self._restore_rating_views()
+        self.channel_ready.set()
+    
+    async def _restore_rating_views(self):
+        """Ré-attache les vues de notation encore ouvertes (perdues au redémarrage)"""
+        try:
+            pending = await run_db(outbox_service.get_pending_views, settings.rating_view_ttl_hours)
+        except Exception as e:
+            logger.error(f"❌ Failed to restore rating views: {e}")
+            return
+        
+        # Un message de binge porte plusieurs notifications
+        by_message = {}
+        for notification in pending:
+            by_message.setdefault(notification["message_id"], []).append(notification)
+        
+        restored = 0
+        for message_id, notifications in by_message.items():
+            unrated = [n for n in notifications if not n["rated"]]
+            if not unrated:
+                continue
+            if len(notifications) == 1:
+                notification = unrated[0]
+                view = RatingView(
+                    notification["user_id"],
+                    notification["content_id"],
+                    notification["content_name"],
+                    notification["watchlog_id"],
+                    sent_at=notification["sent_at"]
+                )
+            else:
+                view = BatchRatingView(unrated, sent_at=notifications[0]["sent_at"])
+            self.add_view(view, message_id=int(message_id))
+            self.rating_views.add(view)
+            restored += 1
+        logger.info(f"🔁 {restored} rating views restored")
+    
+    def _evict_expired_views(self):
+        """
+        Arrête les vues dont la fenêtre de notation est passée : stop() les retire du store de
+        discord.py, qui les garderait sinon en mémoire indéfiniment (timeout=None).
+        """
+        for view in [view for view in self.rating_views if view.is_finished() or view.expired()]:
+            if not view.is_finished():
+                view.stop()
+                self.bridge_metrics.expired_views += 1
+            self.rating_views.discard(view)
+    
+    def wake_outbox(self, outbox_id: int):
+        """Signale une nouvelle notification au worker (appelé dans la loop du bot, jamais bloquant)"""
+        try:
+            self.outbox_wakeups.put_nowait(outbox_id)
+        except asyncio.QueueFull:
+            # Pas grave : la notification est en base, le prochain poll la trouvera
+            self.bridge_metrics.dropped += 1
+            return
+        self.bridge_metrics.wakeups += 1
+        self.bridge_metrics.max_depth = max(self.bridge_metrics.max_depth, self.outbox_wakeups.qsize())
+    
+    async def _run_outbox_worker(self):
+        """
+        Vide l'outbox des demandes de notation.
+        Réveillé par le webhook, et toutes les outbox_poll_seconds pour les retries
+        et les notifications écrites pendant que le bot était hors ligne.
+        """
+        await self.channel_ready.wait()
+        while True:
+            # Valeur poussée (pas de set_function) : lisible aussi en mode multiprocess ; NaN avant le 1er heartbeat
+            if math.isfinite(self.latency):
+                BOT_LATENCY.set(self.latency)
+            self._evict_expired_views()
+            try:
+                await asyncio.wait_for(self.outbox_wakeups.get(), timeout=settings.outbox_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            # Un passage couvre tous les réveils accumulés
+            while not self.outbox_wakeups.empty():
+                self.outbox_wakeups.get_nowait()
+            
+            try:
+                await self._drain_outbox()
+            except Exception as e:
+                logger.error(f"❌ Outbox worker error: {e}")
+    
+    async def _drain_outbox(self):
+        """Envoie les notifications dues par lots, au rythme autorisé par Discord"""
+        while True:
+            batch = await run_db(outbox_service.get_due_notifications, settings.outbox_batch_size)
+            if not batch:
+                return
+            
+            sent = {}
+            try:
+                for group in self._group_notifications(batch):
+                    first = group[0]
+                    try:
+                        with WEBHOOK_PHASE.labels("discord").time():
+                            if len(group) == 1:
+                                message = await self.send_rating_request(
+                                    first["user_id"],
+                                    first["username"],
+                                    first["content_id"],
+                                    first["content_name"],
+                                    first["content_type"],
+                                    first["watchlog_id"]
+                                )
+                            else:
+                                message = await self.send_batch_rating_request(first["username"], first["series_name"], group)
+                    except discord.RateLimited as e:
+                        # Rate limit plus long que discord_max_ratelimit_wait : on attend ce que Discord demande
+                        self.bridge_metrics.rate_limited += 1
+                        logger.warning(f"⏳ Discord rate limit, retrying in {e.retry_after:.1f}s")
+                        await asyncio.sleep(e.retry_after)
+                        break
+                    except Exception as e:
+                        self.bridge_metrics.failed += 1
+                        logger.error(f"❌ Failed to send rating request {first['id']}: {e}")
+                        for notification in group:
+                            await run_db(outbox_service.mark_failed, notification["id"], str(e))
+                        continue
+                    
+                    for notification in group:
+                        sent[notification["id"]] = str(message.id)
+                    self.bridge_metrics.sent += 1
+                    self.bridge_metrics.coalesced += len(group) - 1
+                    self.bridge_metrics.last_delivery_seconds = round((datetime.utcnow() - first["created_at"]).total_seconds(), 3)
+            finally:
+                await run_db(outbox_service.mark_sent, sent)
+            
+            if len(batch) < settings.outbox_batch_size and len(sent) == len(batch):
+                return
+    
+    @staticmethod
+    def _group_notifications(batch: list[dict]) -> list[list[dict]]:
+        """Regroupe les épisodes d'une même série pour un même utilisateur (par messages de 5 max)"""
+        groups = {}
+        for notification in batch:
+            if notification["series_name"]:
+                key = (notification["user_id"], notification["series_name"])
+            else:
+                key = ("single", notification["id"])
+            groups.setdefault(key, []).append(notification)
+        
+        return [
+            group[i:i + MAX_EPISODES_PER_MESSAGE]
+            for group in groups.values()
+            for i in range(0, len(group), MAX_EPISODES_PER_MESSAGE)
+        ]
     
     async def on_message(self, message: discord.Message):
         """Répond quand on mentionne Giorgio"""
@@ -129,13 +495,33 @@ class GiorgioBot(discord.Client):
             )
     
     async def _send_suggestion(self, message: discord.Message):
-        """Envoie une suggestion de film/série"""
-        # TODO: Intégrer le moteur de suggestions (pour l'instant, réponse placeholder)
-        await message.reply(
-            "🎬 *Ah, tu veux que Giorgio te guide dans le monde du septième art!*\n\n"
-            "Patience, *caro mio*... Mon cerveau de connaisseur est encore en construction. "
-            "Bientôt, je te proposerai des chefs-d'œuvre dignes de Fellini! 🇮🇹"
-        )
+        """Envoie des suggestions de films calculées par le recommender"""
+        from src.services import database_service
+        from src.services.recommender import recommender
+        
+        # Seul un compte lié (python -m src.cli link-discord) donne des suggestions personnelles :
+        # un pseudo Discord se choisit librement et dévoilerait les notes d'un autre
+        user_id = await run_db(database_service.get_user_for_discord, str(message.author.id))
+        suggestions = await recommender.suggest(user_id, settings.recommender_suggestions)
+        
+        if not suggestions:
+            await message.reply(
+                "🎬 *Ah, tu veux que Giorgio te guide dans le monde du septième art!*\n\n"
+                "Patience, *caro mio*... Mon cerveau de connaisseur est encore en train de digérer le catalogue. "
+                "Reviens dans un instant! 🇮🇹"
+            )
+            return
+        
+        lines = []
+        for suggestion in suggestions:
+            title = f"**{suggestion['title']}**" + (f" ({suggestion['year']})" if suggestion["year"] else "")
+            if suggestion["because"]:
+                title += f" — parce que tu as aimé *{suggestion['because']}*"
+            lines.append(f"• {title}")
+        
+        intro = "Voilà ce que Giorgio te conseille" if user_id else "Je ne te connais pas encore, mais voilà les chefs-d'œuvre de la maison"
+        await message.reply(f"🎬 *Allora!* {intro} :\n\n" + "\n".join(lines) + "\n\n*Buona visione!* 🍿🇮🇹")
+        logger.info(f"🎯 {len(suggestions)} suggestion(s) sent to {message.author.name}")
     
     async def send_rating_request(self, user_id: str, username: str, content_id: str, content_name: str, content_type: str, watchlog_id: int):
         """
@@ -143,8 +529,7 @@ class GiorgioBot(discord.Client):
         C'est ici que Giorgio brille!
         """
         if not self.notification_channel:
-            logger.error("❌ Notification channel not set!")
-            return
+            raise RuntimeError("Notification channel not set")
         
         # Message personnalisé selon le type
         if content_type == "Episode":
@@ -160,8 +545,28 @@ class GiorgioBot(discord.Client):
         
         view = RatingView(user_id, content_id, content_name, watchlog_id)
         
-        await self.notification_channel.send(content=message_content, view=view)
+        message = await self.notification_channel.send(content=message_content, view=view)
+        self.rating_views.add(view)
         logger.info(f"📤 Rating request sent for {content_name} (user: {username})")
+        return message
+    
+    async def send_batch_rating_request(self, username: str, series_name: str, episodes: list[dict]):
+        """Une seule demande de notation pour plusieurs épisodes enchaînés"""
+        if not self.notification_channel:
+            raise RuntimeError("Notification channel not set")
+        
+        message_content = (
+            f"📺 *Che maratona!* **{username}** vient d'enchaîner **{len(episodes)} épisodes** de **{series_name}**!\n\n"
+            f"Alors, *caro mio*, note chaque épisode de 1 à 10!\n"
+            f"*(1 = mamma mia quelle horreur, 10 = chef-d'œuvre absolu)*"
+        )
+        
+        view = BatchRatingView(episodes)
+        
+        message = await self.notification_channel.send(content=message_content, view=view)
+        self.rating_views.add(view)
+        logger.info(f"📤 Batch rating request sent for {len(episodes)} episodes of {series_name} (user: {username})")
+        return message
 
 import threading
 
@@ -197,34 +602,57 @@ def start_bot(token: SecretStr, channel_id: int):
     logger.info("🧵 Giorgio bot thread started")
 
 
-async def notify_rating_request(user_id: str, username: str, content_id: str, content_name: str, content_type: str, watchlog_id: int):
-    """
-    Fonction appelée par le webhook pour demander une notation.
-    Fait le pont entre FastAPI et le bot Discord.
-    """
+async def stop_bot():
+    """Ferme la connexion Discord (perte du leadership ou arrêt) ; l'outbox garde les notifications"""
     global _bot_instance, _bot_loop
     
     if not _bot_instance or not _bot_loop:
-        logger.error("❌ Giorgio bot not initialized!")
         return
     
-    # Attend que le bot soit prêt
-    retry_count = 0
-    while not _bot_instance.is_ready() and retry_count < 10:
-        await asyncio.sleep(0.5)
-        retry_count += 1
-    
-    if not _bot_instance.is_ready():
-        logger.error("❌ Giorgio bot not ready after 5 seconds")
+    bot, loop = _bot_instance, _bot_loop
+    _bot_instance, _bot_loop = None, None
+    BOT_LATENCY.set(0)
+    try:
+        await asyncio.wait_for(asyncio.wrap_future(asyncio.run_coroutine_threadsafe(bot.close(), loop)), timeout=10)
+        logger.info("🛑 Giorgio bot stopped")
+    except Exception as e:
+        logger.warning(f"⚠️ Giorgio bot did not close cleanly: {e}")
+
+
+def notify_rating_request(outbox_id: int):
+    """
+    Fonction appelée par le webhook une fois la demande de notation écrite dans l'outbox.
+    Réveille le worker du bot et rend la main immédiatement ; si le bot n'est pas
+    disponible, la notification sera envoyée par le prochain poll de l'outbox.
+    """
+    if not _bot_instance or not _bot_loop:
+        # Normal hors du leader : le worker du leader poll l'outbox
+        logger.debug(f"Giorgio bot not running in this process, rating request {outbox_id} stays in the outbox")
         return
     
-    # Schedule la coroutine dans la loop du bot
-    future = asyncio.run_coroutine_threadsafe(
-        _bot_instance.send_rating_request(user_id, username, content_id, content_name, content_type, watchlog_id),
-        _bot_loop
-    )
+    _bot_loop.call_soon_threadsafe(_bot_instance.wake_outbox, outbox_id)
+
+
+def get_bridge_metrics() -> dict:
+    """État du pont FastAPI → Discord pour le monitoring"""
+    if not _bot_instance:
+        return {"initialized": False}
     
-    try:
-        future.result(timeout=10)  # Attend max 10 secondes
-    except Exception as e:
-        logger.error(f"❌ Failed to send rating request: {e}")
\ No newline at end of file
+    metrics = _bot_instance.bridge_metrics
+    return {
+        "initialized": True,
+        "ready": _bot_instance.channel_ready.is_set(),
+        "queue_depth": _bot_instance.outbox_wakeups.qsize(),
+        "queue_max_size": _bot_instance.outbox_wakeups.maxsize,
+        "max_depth": metrics.max_depth,
+        "wakeups": metrics.wakeups,
+        "sent": metrics.sent,
+        "failed": metrics.failed,
+        "rate_limited": metrics.rate_limited,
+        "coalesced": metrics.coalesced,
+        "dropped": metrics.dropped,
+        "last_delivery_seconds": metrics.last_delivery_seconds,
+        "rating_views": len(_bot_instance.rating_views),
+        "expired_views": metrics.expired_views,
+        "ratings": _bot_instance.ratings.stats()
+    }
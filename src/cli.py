@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import logging
+import sys
+
+from config.settings import settings
+
+logging.basicConfig(
+    level=getattr(logging, settings.log_level),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def check_indexes(args) -> int:
+    """Vérifie via EXPLAIN que les requêtes de stats passent par un index"""
+    from src.services.query_plans import explain_stats_queries
+    
+    report = explain_stats_queries()
+    for row in report:
+        flag = "❌" if row["full_scan"] else "✅"
+        print(f"{flag} {row['query']:<16} {row['table'] or '-':<12} type={row['type']:<8} key={row['key']} rows={row['rows']}")
+    
+    full_scans = [row for row in report if row["full_scan"]]
+    if full_scans:
+        print(f"\n❌ {len(full_scans)} full table scan(s) detected")
+        return 1
+    print("\n✅ Every stats query uses an index")
+    return 0
+
+
+def rebuild_stats(args) -> int:
+    """Recalcule la table content_stats depuis l'historique complet"""
+    from src.services import database_service
+    
+    count = database_service.rebuild_content_stats()
+    print(f"✅ content_stats rebuilt for {count} contents")
+    return 0
+
+
+def import_history(args) -> int:
+    """Importe l'historique de visionnage déjà présent dans Jellyfin (reprenable)"""
+    from src.models.database import init_db
+    from src.services.db_executor import shutdown_executor
+    from src.services.history_import import HistoryImporter
+    
+    init_db()
+    try:
+        totals = asyncio.run(HistoryImporter(args.concurrency).run(restart=args.restart))
+    finally:
+        shutdown_executor()
+    
+    print(
+        f"{'❌' if totals['failed'] else '✅'} {totals['users']} users, {totals['pages']} pages in {totals['duration_seconds']}s: "
+        f"{totals['imported']} imported, {totals['skipped']} already known, {totals['undated']} without play date"
+    )
+    if totals["failed"]:
+        print(f"❌ {totals['failed']} import(s) stopped early, run the command again to resume")
+        return 1
+    return 0
+
+
+def link_discord(args) -> int:
+    """Lie un compte Discord à un utilisateur Jellyfin (suggestions personnelles du bot)"""
+    from src.services import database_service
+    
+    if not database_service.link_discord_user(args.username, args.discord_id):
+        print(f"❌ Unknown Jellyfin user: {args.username}")
+        return 1
+    print(f"✅ Discord {args.discord_id} linked to {args.username}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Commandes d'administration de Giorgio")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    check = commands.add_parser("check-indexes", help="EXPLAIN des requêtes de stats, échoue sur un full scan")
+    check.set_defaults(func=check_indexes)
+    
+    rebuild = commands.add_parser("rebuild-stats", help="Recalcule content_stats depuis les watchlogs")
+    rebuild.set_defaults(func=rebuild_stats)
+    
+    history = commands.add_parser("import-history", help="Importe l'historique de visionnage de Jellyfin (reprenable)")
+    history.add_argument("--concurrency", type=int, default=4, help="Utilisateurs importés en parallèle")
+    history.add_argument("--restart", action="store_true", help="Ignore les checkpoints et repart du début")
+    history.set_defaults(func=import_history)
+    
+    link = commands.add_parser("link-discord", help="Lie un compte Discord à un utilisateur Jellyfin")
+    link.add_argument("username", help="Nom d'utilisateur Jellyfin")
+    link.add_argument("discord_id", help="ID Discord du membre (mode développeur → Copier l'identifiant)")
+    link.set_defaults(func=link_discord)
+    
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,29 @@
+import time
+
+# Origine des mesures de démarrage (import de l'app → fin du lifespan → première requête)
+APP_IMPORT_STARTED = time.perf_counter()
+
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from prometheus_client import multiprocess
 import logging
 import asyncio
+import os
 
 from src.api.webhooks import router
 from src.api.stats import router as stats_router
-from src.bot.discord_bot import start_bot
+from src.api.history import router as history_router
+from src.api.metrics import MULTIPROCESS, router as metrics_router, prometheus_router
+from src.bot.discord_bot import get_bridge_metrics, start_bot, stop_bot
 from src.models.database import init_db
+from src.services import database_service
+from src.services.db_executor import run_db, shutdown_executor
+from src.services.ingest import ingest_queue
 from src.services.jellyfin_sync import jellyfin_sync, run_periodic_sync
+from src.services.leader import leader
+from src.services.metrics import HTTP_LATENCY, STARTUP
+from src.services.recommender import recommender, run_recommender_refresh
 from config.settings import settings
 
 logging.basicConfig(
@@ -17,6 +33,42 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Temps de démarrage (secondes depuis APP_IMPORT_STARTED), exposés par /ready et /metrics
+startup_timings = {"import": round(time.perf_counter() - APP_IMPORT_STARTED, 3), "lifespan": None, "first_request": None}
+STARTUP.labels("import").set(startup_timings["import"])
+
+
+def _record_startup(phase: str):
+    startup_timings[phase] = round(time.perf_counter() - APP_IMPORT_STARTED, 3)
+    STARTUP.labels(phase).set(startup_timings[phase])
+    logger.info(f"⏱️ Startup {phase} reached after {startup_timings[phase]}s")
+
+
+# Tâches de fond du leader
+leader_tasks: list[asyncio.Task] = []
+
+
+async def start_leader_duties():
+    """Ce qui ne doit tourner que dans un process : bot Discord, sync du catalogue, suggestions"""
+    # Sync initial (incrémental si un watermark existe) puis périodique, en tâche de fond :
+    # l'API et le webhook répondent pendant que le catalogue se synchronise
+    leader_tasks.append(asyncio.create_task(run_periodic_sync(settings.sync_interval_hours, initial=True)))
+    
+    # Modèle de suggestions (utilisé par le bot), reconstruit hors du chemin des requêtes
+    recommender.mark_dirty()
+    leader_tasks.append(asyncio.create_task(run_recommender_refresh(settings.recommender_refresh_seconds)))
+    
+    # Lance Giorgio dans son thread ; il envoie aussi les notifications écrites par tous les workers
+    start_bot(settings.discord_bot_token, settings.discord_channel_id)
+    logger.info("🤖 Giorgio bot starting...")
+
+
+async def stop_leader_duties():
+    for task in leader_tasks:
+        task.cancel()
+    leader_tasks.clear()
+    await stop_bot()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -27,20 +79,24 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("🗄️ Database initialized")
     
-    # Sync initial du catalogue Jellyfin
-    await jellyfin_sync.full_sync()
+    # Consommateur de la file d'ingestion du webhook
+    ingest_queue.start()
     
-    # Lance la sync périodique en tâche de fond
-    sync_task = asyncio.create_task(run_periodic_sync(settings.sync_interval_hours))
-    
-    # Lance Giorgio dans son thread
-    start_bot(settings.discord_bot_token, settings.discord_channel_id)
-    logger.info("🤖 Giorgio bot starting...")
+    # Tous les workers servent le webhook et les stats ; un seul (le leader) porte le bot et le sync
+    election_task = asyncio.create_task(leader.run(start_leader_duties, stop_leader_duties))
     
+    _record_startup("lifespan")
     yield
     
     # Shutdown
-    sync_task.cancel()
+    election_task.cancel()
+    await ingest_queue.drain()
+    if leader.is_leader:
+        await stop_leader_duties()
+    await leader.resign()
+    shutdown_executor()
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
     logger.info(f"👋 {settings.app_name} shutting down... Arrivederci!")
 
 
@@ -48,6 +104,25 @@ app = FastAPI(title=settings.app_name, version="0.1.0", lifespan=lifespan)
 
 app.include_router(router, prefix="/api", tags=["webhooks"])
 app.include_router(stats_router, prefix="/api/stats", tags=["stats"])
+app.include_router(history_router, prefix="/api/history", tags=["history"])
+app.include_router(metrics_router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(prometheus_router, tags=["metrics"])
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    """Latence par route (gabarit de chemin, pas l'URL brute, pour borner les labels)"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    if startup_timings["first_request"] is None:
+        _record_startup("first_request")
+    route = request.scope.get("route")
+    HTTP_LATENCY.labels(
+        request.method,
+        route.path if route else "unmatched",
+        response.status_code
+    ).observe(time.perf_counter() - started)
+    return response
 
 
 @app.get("/health", tags=["health"])
@@ -55,6 +130,35 @@ async def health_check():
     return {"status": "ok", "bot": "Giorgio 🇮🇹"}
 
 
+@app.get("/ready", tags=["health"])
+async def readiness():
+    """
+    Prêt dès que la BDD répond et que la file d'ingestion est consommée :
+    le webhook n'attend ni le bot ni le sync du catalogue, dont l'état est seulement rapporté.
+    """
+    try:
+        await run_db(database_service.ping_database)
+        database = {"ok": True}
+    except Exception as e:
+        database = {"ok": False, "error": str(e)}
+    
+    # Consommateur de la file arrêté : les webhooks seraient acquittés sans jamais être écrits
+    ingest = {"consumer_alive": ingest_queue.alive(), "retrying": ingest_queue.retrying, "queue_depth": ingest_queue.queue.qsize()}
+    ready = database["ok"] and ingest["consumer_alive"]
+    
+    bot = get_bridge_metrics()
+    content = {
+        "ready": ready,
+        "database": database,
+        "ingest": ingest,
+        "bot": {"initialized": bot["initialized"], "ready": bot.get("ready", False)},
+        "leader": leader.stats(),
+        "sync": jellyfin_sync.state(),
+        "startup_seconds": startup_timings
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=settings.api_port)
\ No newline at end of file
@@ -1,11 +1,25 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import create_engine, text, Column, String, Integer, Float, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 from datetime import datetime
+from pathlib import Path
 
 from config.settings import settings
+from src.models.pool import InstrumentedQueuePool, instrument_engine
+from src.services.metrics import instrument_queries
 
-# Engine et Session
-engine = create_engine(settings.database_url, echo=settings.debug)
+# Engine et Session (partagé par l'API, le bot et le sync)
+engine = create_engine(
+    settings.database_url,
+    echo=settings.debug,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    pool_pre_ping=settings.db_pool_pre_ping
+)
+instrument_engine(engine)
+instrument_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base pour les models
@@ -38,14 +52,51 @@ class Content(Base):
     genres = Column(JSON, nullable=True)  # ["Action", "Sci-Fi"]
     tmdb_id = Column(String(20), nullable=True)
     length = Column(Integer, nullable=True)  # Durée en minutes
+    deleted_at = Column(DateTime, nullable=True)  # Supprimé de Jellyfin (soft-delete)
     
     # Relation vers les watchlogs
     watchlogs = relationship("Watchlog", back_populates="content")
     
+    __table_args__ = (
+        # Comptages du catalogue par type (hors contenus supprimés)
+        Index("ix_contents_type_deleted", "type", "deleted_at"),
+    )
+    
     def __repr__(self):
         return f"<Content {self.title} ({self.type})>"
 
 
+class Genre(Base):
+    """Genre du catalogue (forme normalisée de Content.genres)"""
+    __tablename__ = "genres"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(100), nullable=False)
+    
+    __table_args__ = (
+        Index("uq_genres_name", "name", unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<Genre {self.name}>"
+
+
+class ContentGenre(Base):
+    """Association contenu ↔ genre, pour les requêtes par genre sans scanner le JSON"""
+    __tablename__ = "content_genres"
+    
+    content_id = Column(String(36), ForeignKey("contents.id"), primary_key=True)
+    genre_id = Column(Integer, ForeignKey("genres.id"), primary_key=True)
+    
+    __table_args__ = (
+        # Contenus d'un genre (la PK couvre les genres d'un contenu)
+        Index("ix_content_genres_genre", "genre_id", "content_id"),
+    )
+    
+    def __repr__(self):
+        return f"<ContentGenre {self.content_id} → {self.genre_id}>"
+
+
 class Watchlog(Base):
     """Historique de visionnage avec notation"""
     __tablename__ = "watchlogs"
@@ -56,18 +107,144 @@ class Watchlog(Base):
     rating = Column(Integer, nullable=True)  # 1-10
     watched_at = Column(DateTime, default=datetime.utcnow)
     rated_at = Column(DateTime, nullable=True)
+    dedupe_key = Column(String(40), nullable=True)  # Idempotence des webhooks (cf. services/dedupe.py)
     
     # Relations
     user = relationship("User", back_populates="watchlogs")
     content = relationship("Content", back_populates="watchlogs")
     
+    __table_args__ = (
+        # get_latest_watchlog + stats par utilisateur
+        Index("ix_watchlogs_user_content_watched", "user_id", "content_id", "watched_at"),
+        # Activité récente (ORDER BY watched_at DESC LIMIT n) et pagination de /api/history
+        Index("ix_watchlogs_watched_at", "watched_at"),
+        # Historique d'un utilisateur trié par date (keyset sur watched_at, id)
+        Index("ix_watchlogs_user_watched", "user_id", "watched_at"),
+        # Top contenus : GROUP BY content_id sur les notes non nulles, sans lire la table
+        Index("ix_watchlogs_content_rating", "content_id", "rating"),
+        # Un même visionnage ne peut être enregistré deux fois (NULL autorisé plusieurs fois)
+        Index("uq_watchlogs_dedupe_key", "dedupe_key", unique=True),
+    )
+    
     def __repr__(self):
         return f"<Watchlog {self.user_id} → {self.content_id} ({self.rating}/10)>"
 
 
+class ContentStats(Base):
+    """Agrégats de visionnage et de notes par contenu, maintenus à chaque écriture"""
+    __tablename__ = "content_stats"
+    
+    content_id = Column(String(36), ForeignKey("contents.id"), primary_key=True)
+    watch_count = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    avg_rating = Column(Float, nullable=True)  # rating_sum / rating_count, stocké pour l'index
+    last_watched_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # Leaderboards : ORDER BY ... LIMIT n directement sur l'index
+        Index("ix_content_stats_watch_count", "watch_count"),
+        Index("ix_content_stats_avg_rating", "avg_rating", "rating_count"),
+    )
+    
+    def __repr__(self):
+        return f"<ContentStats {self.content_id} ({self.watch_count} watches)>"
+
+
+class NotificationOutbox(Base):
+    """Demandes de notation Discord à envoyer, écrites dans la même transaction que le watchlog"""
+    __tablename__ = "notification_outbox"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    watchlog_id = Column(Integer, ForeignKey("watchlogs.id"), nullable=False, unique=True)
+    user_id = Column(String(36), nullable=False)
+    username = Column(String(100), nullable=False)
+    content_id = Column(String(36), nullable=False)
+    content_name = Column(String(255), nullable=False)
+    content_type = Column(String(20), nullable=False)  # 'Movie' | 'Episode' (type Jellyfin)
+    series_name = Column(String(255), nullable=True)  # Épisodes : regroupés par (user_id, series_name)
+    status = Column(String(10), nullable=False, default="pending")  # 'pending' | 'sent' | 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String(255), nullable=True)
+    message_id = Column(String(20), nullable=True)  # Message Discord, pour ré-attacher la vue
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # Le worker lit les notifications dues : status = 'pending' AND next_attempt_at <= now
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+    
+    def __repr__(self):
+        return f"<NotificationOutbox {self.watchlog_id} ({self.status})>"
+
+
+class SyncState(Base):
+    """Watermark de synchronisation du catalogue, par type d'item Jellyfin"""
+    __tablename__ = "sync_state"
+    
+    item_type = Column(String(20), primary_key=True)  # 'Movie' | 'Episode'
+    last_sync_at = Column(DateTime, nullable=True)  # Dernier sync réussi (incrémental ou complet)
+    last_full_sync_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<SyncState {self.item_type} @ {self.last_sync_at}>"
+
+
+class HistoryImportState(Base):
+    """Checkpoint de l'import de l'historique Jellyfin, par utilisateur et type d'item"""
+    __tablename__ = "history_import_state"
+    
+    user_id = Column(String(36), primary_key=True)
+    item_type = Column(String(20), primary_key=True)  # 'Movie' | 'Episode'
+    next_index = Column(Integer, nullable=False, default=0)  # StartIndex de la prochaine page (point de départ de la reprise)
+    last_created_at = Column(DateTime, nullable=True)  # DateCreated du dernier item écrit : clé de tri de la reprise
+    last_item_id = Column(String(36), nullable=True)
+    total = Column(Integer, nullable=True)  # Items joués côté Jellyfin au dernier passage
+    imported = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<HistoryImportState {self.user_id} {self.item_type} @ {self.next_index}>"
+
+
+class CacheGeneration(Base):
+    """Compteur d'invalidation d'un cache local, partagé par tous les workers"""
+    __tablename__ = "cache_generations"
+    
+    name = Column(String(50), primary_key=True)  # 'stats'
+    generation = Column(Integer, nullable=False, default=0)  # Incrémenté après chaque écriture
+    
+    def __repr__(self):
+        return f"<CacheGeneration {self.name} = {self.generation}>"
+
+
 def init_db():
-    """Crée toutes les tables"""
-    Base.metadata.create_all(bind=engine)
+    """
+    Crée les tables manquantes puis applique les migrations Alembic.
+    Sérialisé par un verrou MariaDB : plusieurs workers peuvent démarrer en même temps.
+    """
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT GET_LOCK('giorgio:migrations', 120)")).scalar() != 1:
+            raise RuntimeError("Timed out waiting for the migrations lock")
+        try:
+            Base.metadata.create_all(bind=engine)
+            run_migrations()
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK('giorgio:migrations')"))
+
+
+def run_migrations():
+    """Équivalent de `alembic upgrade head` (les migrations sont idempotentes)"""
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(str(Path(__file__).resolve().parents[2] / "alembic.ini"))
+    config.attributes["configure_logger"] = False  # Garde la config logging de l'app
+    command.upgrade(config, "head")
 
 
 def get_db():
@@ -0,0 +1,86 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from src.services.metrics import DB_POOL_WAIT
+
+
+class PoolMetrics:
+    """Compteurs de santé du pool, partagés entre les threads"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connect_errors = 0
+        self.disconnects = 0
+        self.invalidated = 0
+    
+    def observe_wait(self, seconds: float):
+        # Distribution dans l'histogramme Prometheus ; seul le max (qu'il ne donne pas) est gardé ici
+        DB_POOL_WAIT.observe(seconds)
+        with self._lock:
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+    
+    def incr(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool qui mesure l'attente de chaque checkout et compte les échecs"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.incr("timeouts")
+            raise
+        except Exception:
+            # Échec d'ouverture d'une nouvelle connexion (MariaDB injoignable, auth...)
+            self.metrics.incr("connect_errors")
+            raise
+        finally:
+            self.metrics.observe_wait(time.perf_counter() - started)
+    
+    def recreate(self):
+        # Conserve les compteurs si le pool est recréé (engine.dispose)
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+    
+    def snapshot(self) -> dict:
+        metrics = self.metrics
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_wait_seconds": round(metrics.max_wait_seconds, 6),
+            "timeouts": metrics.timeouts,
+            "connect_errors": metrics.connect_errors,
+            "disconnects": metrics.disconnects,
+            "invalidated": metrics.invalidated
+        }
+
+
+def instrument_engine(engine):
+    """Branche les événements de l'engine sur les compteurs du pool"""
+    
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        # Connexion coupée côté serveur (wait_timeout, redémarrage de MariaDB)
+        if context.is_disconnect:
+            engine.pool.metrics.incr("disconnects")
+    
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        engine.pool.metrics.incr("invalidated")
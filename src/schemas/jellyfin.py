@@ -1,8 +1,12 @@
-from pydantic import BaseModel, field_validator
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import Collection, Optional
 from datetime import datetime
+import orjson
 
 class JellyfinWebhook(BaseModel):
+    # Seuls les champs utiles sont validés : Overview, Tagline, Video_*/Audio_*... sont ignorés
+    model_config = ConfigDict(extra="ignore")
+    
     NotificationType: str
     ItemId: str
     ItemType: str
@@ -10,6 +14,7 @@ class JellyfinWebhook(BaseModel):
     UserId: str
     NotificationUsername: str
     Timestamp: datetime
+    UtcTimestamp: Optional[datetime] = None
     
     # Optionnels - Episodes uniquement
     SeriesName: Optional[str] = None
@@ -26,4 +31,20 @@ class JellyfinWebhook(BaseModel):
     def get_genres_list(self) -> list[str]:
         if not self.Genres:
             return []
-        return [g.strip() for g in self.Genres.split(",")]
\ No newline at end of file
+        return [g.strip() for g in self.Genres.split(",")]
+
+
+def parse_webhook(body: bytes, handled: Collection[str]) -> tuple[Optional[str], Optional[JellyfinWebhook]]:
+    """
+    Décode un webhook et lit NotificationType avant toute validation.
+    Le modèle n'est construit que pour les types traités ; sinon retourne (type, None).
+    Lève orjson.JSONDecodeError (sous-classe de json.JSONDecodeError) ou ValidationError.
+    """
+    raw = orjson.loads(body)
+    if not isinstance(raw, dict):
+        raise orjson.JSONDecodeError("Webhook payload is not an object", body.decode(errors="replace"), 0)
+    
+    event_type = raw.get("NotificationType")
+    if event_type not in handled:
+        return event_type, None
+    return event_type, JellyfinWebhook.model_validate(raw)
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+
+from config.settings import settings
+from src.models.database import SessionLocal, CacheGeneration
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Cache LRU borné avec expiration (TTL), thread-safe :
+    il est alimenté par FastAPI et invalidé depuis le thread du bot Discord.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrémenté à chaque invalidation : une valeur calculée avant ne doit pas être stockée
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Valeur en cache, ou None si absente / expirée"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """Stocke une valeur ; ignorée si une invalidation a eu lieu depuis `generation`"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key: Hashable):
+        """Retire une clé (sans effet si absente)"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Supprime les entrées dont la clé vérifie predicate"""
+        with self._lock:
+            self.generation += 1
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+            return len(keys)
+    
+    def clear(self):
+        self.invalidate(lambda key: True)
+    
+    def stats(self) -> dict:
+        """Compteurs pour le monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+class SharedGeneration:
+    """
+    Invalidation d'un cache local entre workers : chaque écriture incrémente un compteur en base,
+    chaque lecture le relit (SELECT par clé primaire) et vide le cache local s'il a bougé.
+    Les invalidations fines restent locales ; un autre worker vide tout son cache.
+    """
+    
+    def __init__(self, cache: TTLCache, name: str):
+        self.cache = cache
+        self.name = name
+        self._known: Optional[int] = None
+        self._lock = threading.Lock()
+        self.bumps = 0
+        self.remote_invalidations = 0
+    
+    def bump(self):
+        """Signale une écriture aux autres workers (à appeler après le commit des données)"""
+        db = SessionLocal()
+        try:
+            db.execute(text(
+                "INSERT INTO cache_generations (name, generation) VALUES (:name, LAST_INSERT_ID(1)) "
+                "ON DUPLICATE KEY UPDATE generation = LAST_INSERT_ID(generation + 1)"
+            ), {"name": self.name})
+            generation = db.execute(text("SELECT LAST_INSERT_ID()")).scalar()
+            db.commit()
+        except Exception as e:
+            # Les données sont déjà commitées : les autres workers se rattraperont au TTL
+            db.rollback()
+            logger.error(f"❌ Failed to bump the {self.name} cache generation: {e}")
+            return
+        finally:
+            db.close()
+        
+        with self._lock:
+            self.bumps += 1
+            # Aucune autre écriture depuis la dernière valeur connue : le cache local est déjà à jour
+            if self._known == generation - 1:
+                self._known = generation
+    
+    def check(self):
+        """Vide le cache local si un autre worker a écrit depuis la dernière lecture"""
+        db = SessionLocal()
+        try:
+            generation = db.query(CacheGeneration.generation)\
+                .filter(CacheGeneration.name == self.name)\
+                .scalar() or 0
+        finally:
+            db.close()
+        
+        with self._lock:
+            changed = self._known is not None and generation > self._known
+            self._known = max(generation, self._known or 0)
+            if changed:
+                self.remote_invalidations += 1
+        if changed:
+            self.cache.clear()
+    
+    def stats(self) -> dict:
+        return {
+            "generation": self._known,
+            "bumps": self.bumps,
+            "remote_invalidations": self.remote_invalidations
+        }
+
+
+# Cache des réponses /api/stats — clés : (endpoint, paramètres...)
+# Les stats d'un utilisateur ont pour clé ("user", user_id)
+stats_cache = TTLCache(settings.stats_cache_max_entries, settings.stats_cache_ttl_seconds)
+stats_generation = SharedGeneration(stats_cache, "stats")
+
+
+def invalidate_stats(user_ids: Iterable[str]):
+    """Invalide les stats globales et celles des utilisateurs concernés par une écriture (tous les workers)"""
+    user_ids = set(user_ids)
+    stats_cache.invalidate(lambda key: key[0] != "user" or key[1] in user_ids)
+    stats_generation.bump()
+
+
+def clear_stats():
+    """Invalide toutes les stats, dans tous les workers (catalogue modifié, stats recalculées)"""
+    stats_cache.clear()
+    stats_generation.bump()
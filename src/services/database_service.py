@@ -1,9 +1,18 @@
+from sqlalchemy import case, func, insert, select, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.orm import Session
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
+import hashlib
+import json
 import logging
 
-from src.models.database import SessionLocal, User, Content, Watchlog
+from src.models.database import SessionLocal, User, Content, Genre, ContentGenre, Watchlog, ContentStats, NotificationOutbox, SyncState, HistoryImportState
+from src.services import outbox_service
+from src.services.cache import clear_stats, invalidate_stats
+from src.services.dedupe import playback_dedupe_key
+from src.services.recommender import recommender
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +33,44 @@ def get_or_create_user(jellyfin_id: str, username: str) -> User:
         db.close()
 
 
+def ping_database():
+    """Lève une exception si MariaDB ne répond pas"""
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
+
+def get_user_for_discord(discord_id: str) -> Optional[str]:
+    """ID Jellyfin lié à un membre Discord (jamais déduit de son pseudo, que chacun choisit)"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.discord_id == discord_id).first()
+        return user.jellyfin_id if user else None
+    finally:
+        db.close()
+
+
+def link_discord_user(username: str, discord_id: str) -> bool:
+    """Lie un compte Discord à l'utilisateur Jellyfin de ce nom ; False si l'utilisateur est inconnu"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(func.lower(User.username) == username.lower()).first()
+        if not user:
+            return False
+        # Un compte Discord ne désigne qu'un utilisateur Jellyfin
+        db.query(User)\
+            .filter(User.discord_id == discord_id, User.jellyfin_id != user.jellyfin_id)\
+            .update({User.discord_id: None}, synchronize_session=False)
+        user.discord_id = discord_id
+        db.commit()
+        logger.info(f"🔗 Discord {discord_id} linked to {user.username}")
+        return True
+    finally:
+        db.close()
+
+
 def get_or_create_content(
     content_id: str,
     title: str,
@@ -48,6 +95,8 @@ def get_or_create_content(
                 length=length
             )
             db.add(content)
+            db.flush()
+            _replace_content_genres(db, {content_id: genres})
             db.commit()
             db.refresh(content)
             logger.info(f"🎬 New content added: {title}")
@@ -56,6 +105,213 @@ def get_or_create_content(
         db.close()
 
 
+# Champs comparés pour savoir si un contenu existant doit être mis à jour
+CONTENT_FIELDS = ("title", "type", "year", "genres", "tmdb_id", "length")
+
+
+def content_hash(row) -> bytes:
+    """Empreinte des champs suivis d'un contenu (dict ou row SQLAlchemy)"""
+    get = row.get if isinstance(row, dict) else lambda f: getattr(row, f)
+    payload = json.dumps([get(f) for f in CONTENT_FIELDS], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+
+def _index_rows(rows) -> dict:
+    """Index id → empreinte (None pour un contenu soft-deleted, qu'il faut réactiver)"""
+    return {r.id: (None if r.deleted_at else content_hash(r)) for r in rows}
+
+
+def load_content_index(content_type: str) -> dict:
+    """Charge en une requête l'index id → empreinte de tous les contenus d'un type"""
+    db = SessionLocal()
+    try:
+        rows = db.query(Content.id, Content.deleted_at, *(getattr(Content, f) for f in CONTENT_FIELDS))\
+            .filter(Content.type == content_type)\
+            .all()
+        return _index_rows(rows)
+    finally:
+        db.close()
+
+
+def bulk_upsert_contents(rows: list[dict], index: Optional[dict] = None) -> dict:
+    """
+    Insère ou met à jour un lot de contenus en une seule transaction.
+    Chaque row contient la clé 'id' + CONTENT_FIELDS.
+    Si index (cf. load_content_index) est fourni, aucun SELECT n'est fait et l'index est tenu à jour.
+    Retourne les compteurs inserted / updated / unchanged.
+    """
+    counters = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return counters
+
+    # Dédoublonne par ID (le dernier gagne)
+    rows_by_id = {row["id"]: row for row in rows}
+
+    db = SessionLocal()
+    try:
+        if index is None:
+            # Un seul SELECT pour tout le lot
+            existing = db.query(Content.id, Content.deleted_at, *(getattr(Content, f) for f in CONTENT_FIELDS))\
+                .filter(Content.id.in_(list(rows_by_id)))\
+                .all()
+            index = _index_rows(existing)
+
+        inserts, updates, hashes = [], [], {}
+        for content_id, row in rows_by_id.items():
+            hashes[content_id] = content_hash(row)
+            if content_id not in index:
+                inserts.append(row)
+            elif index[content_id] != hashes[content_id]:
+                updates.append({**row, "deleted_at": None})
+            else:
+                counters["unchanged"] += 1
+
+        if inserts:
+            # Upsert : le webhook a pu créer le contenu depuis le chargement de l'index (sync en tâche de fond)
+            stmt = mysql_insert(Content)
+            db.execute(stmt.on_duplicate_key_update(**{field: stmt.inserted[field] for field in CONTENT_FIELDS}), inserts)
+        if updates:
+            db.bulk_update_mappings(Content, updates)
+        _replace_content_genres(db, {row["id"]: row.get("genres") for row in inserts + updates})
+        db.commit()
+        if inserts or updates:
+            clear_stats()
+            recommender.mark_dirty()
+        index.update(hashes)
+
+        counters["inserted"] = len(inserts)
+        counters["updated"] = len(updates)
+        return counters
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _replace_content_genres(db: Session, genres_by_content: dict[str, Optional[list]]):
+    """Réécrit les lignes content_genres des contenus donnés (les genres inconnus sont créés)"""
+    if not genres_by_content:
+        return
+    
+    names = {name.strip() for genres in genres_by_content.values() for name in genres or [] if name.strip()}
+    genre_ids = _genre_ids(db, names) if names else {}
+    
+    db.query(ContentGenre)\
+        .filter(ContentGenre.content_id.in_(list(genres_by_content)))\
+        .delete(synchronize_session=False)
+    rows = [
+        {"content_id": content_id, "genre_id": genre_id}
+        for content_id, genres in genres_by_content.items()
+        for genre_id in {genre_ids[name.strip()] for name in genres or [] if name.strip()}
+    ]
+    if rows:
+        db.execute(insert(ContentGenre), rows)
+
+
+def _genre_ids(db: Session, names: set[str]) -> dict[str, int]:
+    """
+    Id de chaque nom de genre, créé au besoin.
+    genres.name est en utf8mb4_general_ci (casse et accents ignorés) : "Comédie" et "comedie"
+    sont une seule ligne, dont le nom stocké peut différer du nom demandé. Les noms sans
+    correspondance exacte sont recherchés un par un, avec la collation de la colonne.
+    """
+    db.execute(mysql_insert(Genre).prefix_with("IGNORE"), [{"name": name} for name in names])
+    genre_ids = {
+        name: genre_id
+        for name, genre_id in db.query(Genre.name, Genre.id).filter(Genre.name.in_(names))
+        if name in names
+    }
+    for name in names - set(genre_ids):
+        genre_ids[name] = db.query(Genre.id).filter(Genre.name == name).scalar()
+    return genre_ids
+
+
+def soft_delete_contents(content_ids: list[str], batch_size: int = 1000) -> int:
+    """Marque des contenus comme supprimés de Jellyfin, en une transaction"""
+    if not content_ids:
+        return 0
+
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        deleted = 0
+        for i in range(0, len(content_ids), batch_size):
+            deleted += db.query(Content)\
+                .filter(Content.id.in_(content_ids[i:i + batch_size]), Content.deleted_at.is_(None))\
+                .update({Content.deleted_at: now}, synchronize_session=False)
+        db.commit()
+        clear_stats()
+        recommender.mark_dirty()
+        logger.info(f"🗑️ {deleted} contents marked as deleted")
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _record_watch_stats(db: Session, watchlogs: list[Watchlog]):
+    """Incrémente content_stats pour de nouveaux visionnages, en un INSERT multi-lignes (transaction en cours)"""
+    per_content = {}
+    for watchlog in watchlogs:
+        count, last_watched_at = per_content.get(watchlog.content_id, (0, watchlog.watched_at))
+        per_content[watchlog.content_id] = (count + 1, max(last_watched_at, watchlog.watched_at))
+
+    stmt = mysql_insert(ContentStats).values([
+        {
+            "content_id": content_id,
+            "watch_count": count,
+            "rating_count": 0,
+            "rating_sum": 0,
+            "last_watched_at": last_watched_at
+        }
+        for content_id, (count, last_watched_at) in per_content.items()
+    ])
+    db.execute(stmt.on_duplicate_key_update(
+        watch_count=ContentStats.watch_count + stmt.inserted.watch_count,
+        last_watched_at=func.greatest(
+            func.coalesce(ContentStats.last_watched_at, stmt.inserted.last_watched_at),
+            stmt.inserted.last_watched_at
+        )
+    ))
+
+
+def _record_rating_stats(db: Session, content_id: str, old_rating: Optional[int], new_rating: int):
+    """Répercute une note (nouvelle ou modifiée) dans content_stats (dans la transaction en cours)"""
+    count_delta = 0 if old_rating is not None else 1
+    sum_delta = new_rating - (old_rating or 0)
+    _apply_rating_deltas(db, content_id, count_delta, sum_delta)
+    _refresh_avg_ratings(db, [content_id])
+
+
+def _apply_rating_deltas(db: Session, content_id: str, count_delta: int, sum_delta: int):
+    """Ajoute des deltas de nombre et de somme des notes à content_stats (avg_rating via _refresh_avg_ratings)"""
+    db.query(ContentStats)\
+        .filter(ContentStats.content_id == content_id)\
+        .update({
+            ContentStats.rating_count: ContentStats.rating_count + count_delta,
+            ContentStats.rating_sum: ContentStats.rating_sum + sum_delta
+        }, synchronize_session=False)
+
+
+def _refresh_avg_ratings(db: Session, content_ids: list[str]):
+    """
+    Recalcule avg_rating depuis rating_sum / rating_count déjà mis à jour.
+    Instruction séparée : MariaDB évalue le SET de gauche à droite avec les nouvelles valeurs,
+    un avg calculé dans le même UPDATE appliquerait les deltas deux fois.
+    """
+    db.query(ContentStats)\
+        .filter(ContentStats.content_id.in_(content_ids))\
+        .update({
+            ContentStats.avg_rating: case(
+                (ContentStats.rating_count > 0, ContentStats.rating_sum * 1.0 / ContentStats.rating_count),
+                else_=None
+            )
+        }, synchronize_session=False)
+
+
 def create_watchlog(user_id: str, content_id: str) -> Watchlog:
     """Crée une entrée de visionnage (sans note pour l'instant)"""
     db = SessionLocal()
@@ -66,7 +322,9 @@ def create_watchlog(user_id: str, content_id: str) -> Watchlog:
             watched_at=datetime.utcnow()
         )
         db.add(watchlog)
+        _record_watch_stats(db, [watchlog])
         db.commit()
+        invalidate_stats([user_id])
         db.refresh(watchlog)
         logger.info(f"📝 Watchlog created: {user_id} → {content_id}")
         return watchlog
@@ -74,15 +332,175 @@ def create_watchlog(user_id: str, content_id: str) -> Watchlog:
         db.close()
 
 
+@dataclass
+class PlaybackRecord:
+    """Résultat léger de record_playback, suffisant pour la notification Discord"""
+    watchlog_id: int
+    content_title: str
+    outbox_id: Optional[int] = None  # Demande de notation Discord à envoyer
+
+
+def record_playback(
+    user_id: str,
+    username: str,
+    content_id: str,
+    title: str,
+    content_type: str,
+    year: Optional[int] = None,
+    genres: Optional[list] = None,
+    tmdb_id: Optional[str] = None,
+    notify: bool = False,
+    series_name: Optional[str] = None
+) -> Optional[PlaybackRecord]:
+    """
+    Enregistre un visionnage terminé en une seule transaction :
+    résout (ou crée) l'utilisateur et le contenu, puis insère le watchlog.
+    Si notify=True, la demande de notation Discord est écrite dans l'outbox (même transaction).
+    """
+    return record_playbacks([{
+        "user_id": user_id,
+        "username": username,
+        "content_id": content_id,
+        "title": title,
+        "content_type": content_type,
+        "year": year,
+        "genres": genres,
+        "tmdb_id": tmdb_id,
+        "notify": notify,
+        "series_name": series_name
+    }])[0]
+
+
+def record_playbacks(events: list[dict]) -> list[Optional[PlaybackRecord]]:
+    """
+    Enregistre un lot de visionnages terminés en une seule transaction.
+    Chaque event contient les arguments de record_playback (+ watched_at, dedupe_key et adjacent_keys optionnels).
+    Retourne un PlaybackRecord par event, dans le même ordre, ou None pour un doublon.
+    """
+    if not events:
+        return []
+
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        # Doublons : clé (ou clé d'une fenêtre voisine) déjà en base ou répétée dans le lot
+        keys = {
+            key
+            for event in events if event.get("dedupe_key")
+            for key in [event["dedupe_key"], *event.get("adjacent_keys", [])]
+        }
+        known_keys = set()
+        if keys:
+            known_keys = {r.dedupe_key for r in db.query(Watchlog.dedupe_key).filter(Watchlog.dedupe_key.in_(keys))}
+        results = []
+        for event in events:
+            key = event.get("dedupe_key")
+            if key and not known_keys.isdisjoint([key, *event.get("adjacent_keys", [])]):
+                results.append(None)
+                continue
+            if key:
+                known_keys.add(key)
+            results.append(event)
+        events = [event for event in results if event is not None]
+        if not events:
+            return results
+
+        # Un SELECT pour les utilisateurs et un pour les contenus de tout le lot
+        user_ids = {event["user_id"] for event in events}
+        known_users = {
+            r.jellyfin_id for r in db.query(User.jellyfin_id).filter(User.jellyfin_id.in_(user_ids))
+        }
+        titles = {
+            r.id: r.title
+            for r in db.query(Content.id, Content.title).filter(Content.id.in_({event["content_id"] for event in events}))
+        }
+
+        new_genres = {}
+        for event in events:
+            if event["user_id"] not in known_users:
+                db.add(User(jellyfin_id=event["user_id"], username=event["username"]))
+                known_users.add(event["user_id"])
+                logger.info(f"👤 New user created: {event['username']}")
+            if event["content_id"] not in titles:
+                db.add(Content(
+                    id=event["content_id"],
+                    title=event["title"],
+                    type=event["content_type"],
+                    year=event.get("year"),
+                    genres=event.get("genres"),
+                    tmdb_id=event.get("tmdb_id")
+                ))
+                titles[event["content_id"]] = event["title"]
+                new_genres[event["content_id"]] = event.get("genres")
+                logger.info(f"🎬 New content added: {event['title']}")
+
+        watchlogs = [
+            Watchlog(
+                user_id=event["user_id"],
+                content_id=event["content_id"],
+                watched_at=event.get("watched_at") or now,
+                dedupe_key=event.get("dedupe_key")
+            )
+            for event in events
+        ]
+        db.add_all(watchlogs)
+        db.flush()  # INSERT multi-lignes, IDs récupérés sans refresh
+        _record_watch_stats(db, watchlogs)
+        _replace_content_genres(db, new_genres)
+
+        records = []
+        for event, watchlog in zip(events, watchlogs):
+            record = PlaybackRecord(watchlog_id=watchlog.id, content_title=titles[event["content_id"]])
+            records.append(record)
+            if not event.get("notify"):
+                continue
+
+            # Les épisodes d'une même série sont regroupés dans une fenêtre de debounce
+            send_at = watchlog.watched_at
+            series_name = event.get("series_name")
+            if series_name:
+                send_at = outbox_service.debounce_series(db, event["user_id"], series_name, watchlog.watched_at)
+            outbox = NotificationOutbox(
+                watchlog_id=watchlog.id,
+                user_id=event["user_id"],
+                username=event["username"],
+                content_id=event["content_id"],
+                content_name=record.content_title,
+                content_type=event["content_type"].capitalize(),
+                series_name=series_name,
+                next_attempt_at=send_at
+            )
+            db.add(outbox)
+            db.flush()  # Visible du debounce de l'épisode suivant du lot
+            record.outbox_id = outbox.id
+
+        db.commit()
+        invalidate_stats(user_ids)
+        logger.info(f"📝 {len(watchlogs)} watchlog(s) created")
+
+        # Replace les records à la position de leur event, les doublons restent à None
+        written = iter(records)
+        return [next(written) if event is not None else None for event in results]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def update_rating(watchlog_id: int, rating: int) -> Optional[Watchlog]:
     """Met à jour la note d'un visionnage"""
     db = SessionLocal()
     try:
         watchlog = db.query(Watchlog).filter(Watchlog.id == watchlog_id).first()
         if watchlog:
+            _record_rating_stats(db, watchlog.content_id, watchlog.rating, rating)
             watchlog.rating = rating
             watchlog.rated_at = datetime.utcnow()
+            user_id = watchlog.user_id
             db.commit()
+            invalidate_stats([user_id])
+            recommender.mark_dirty()
             db.refresh(watchlog)
             logger.info(f"⭐ Rating updated: watchlog {watchlog_id} = {rating}/10")
         return watchlog
@@ -90,6 +508,80 @@ def update_rating(watchlog_id: int, rating: int) -> Optional[Watchlog]:
         db.close()
 
 
+def update_ratings(ratings: dict[int, int]) -> int:
+    """
+    Enregistre un lot de notes (watchlog_id → note) en une transaction :
+    un SELECT, un UPDATE multi-lignes des watchlogs, un UPDATE content_stats par contenu
+    puis un seul recalcul des moyennes des contenus touchés.
+    Retourne le nombre de watchlogs notés.
+    """
+    if not ratings:
+        return 0
+    
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        watchlogs = db.query(Watchlog.id, Watchlog.user_id, Watchlog.content_id, Watchlog.rating)\
+            .filter(Watchlog.id.in_(list(ratings)))\
+            .all()
+        
+        deltas = {}
+        for watchlog in watchlogs:
+            new_rating = ratings[watchlog.id]
+            count_delta, sum_delta = deltas.get(watchlog.content_id, (0, 0))
+            deltas[watchlog.content_id] = (
+                count_delta + (0 if watchlog.rating is not None else 1),
+                sum_delta + new_rating - (watchlog.rating or 0)
+            )
+        for content_id, (count_delta, sum_delta) in deltas.items():
+            _apply_rating_deltas(db, content_id, count_delta, sum_delta)
+        if deltas:
+            _refresh_avg_ratings(db, list(deltas))
+        
+        db.bulk_update_mappings(Watchlog, [
+            {"id": watchlog.id, "rating": ratings[watchlog.id], "rated_at": now}
+            for watchlog in watchlogs
+        ])
+        db.commit()
+        invalidate_stats({watchlog.user_id for watchlog in watchlogs})
+        recommender.mark_dirty()
+        logger.info(f"⭐ {len(watchlogs)} rating(s) saved in one transaction")
+        return len(watchlogs)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def rebuild_content_stats() -> int:
+    """Recalcule entièrement content_stats depuis les watchlogs (backfill / réparation)"""
+    db = SessionLocal()
+    try:
+        db.query(ContentStats).delete(synchronize_session=False)
+        aggregates = select(
+            Watchlog.content_id,
+            func.count(Watchlog.id),
+            func.count(Watchlog.rating),
+            func.coalesce(func.sum(Watchlog.rating), 0),
+            func.avg(Watchlog.rating),
+            func.max(Watchlog.watched_at)
+        ).group_by(Watchlog.content_id)
+        result = db.execute(insert(ContentStats).from_select(
+            ["content_id", "watch_count", "rating_count", "rating_sum", "avg_rating", "last_watched_at"],
+            aggregates
+        ))
+        db.commit()
+        clear_stats()
+        logger.info(f"📊 content_stats rebuilt: {result.rowcount} contents")
+        return result.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def get_latest_watchlog(user_id: str, content_id: str) -> Optional[Watchlog]:
     """Récupère le dernier visionnage d'un contenu par un utilisateur"""
     db = SessionLocal()
@@ -100,4 +592,150 @@ def get_latest_watchlog(user_id: str, content_id: str) -> Optional[Watchlog]:
             .first()
         return watchlog
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_sync_state(item_type: str) -> Optional[SyncState]:
+    """Récupère le watermark de sync d'un type d'item"""
+    db = SessionLocal()
+    try:
+        return db.query(SyncState).filter(SyncState.item_type == item_type).first()
+    finally:
+        db.close()
+
+
+def save_sync_watermark(item_type: str, synced_at: datetime, full: bool = False):
+    """Enregistre un sync réussi (et complet si full=True)"""
+    db = SessionLocal()
+    try:
+        state = db.query(SyncState).filter(SyncState.item_type == item_type).first()
+        if not state:
+            state = SyncState(item_type=item_type)
+            db.add(state)
+        state.last_sync_at = synced_at
+        if full:
+            state.last_full_sync_at = synced_at
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_history_import_states() -> dict[tuple[str, str], HistoryImportState]:
+    """Checkpoints de l'import d'historique, par (user_id, item_type)"""
+    db = SessionLocal()
+    try:
+        return {(state.user_id, state.item_type): state for state in db.query(HistoryImportState).all()}
+    finally:
+        db.close()
+
+
+def reset_history_import():
+    """Repart de zéro au prochain import (les watchlogs déjà importés restent, ils seront ignorés)"""
+    db = SessionLocal()
+    try:
+        db.query(HistoryImportState).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def import_watch_history(
+    user_id: str,
+    username: str,
+    item_type: str,
+    rows: list[dict],
+    plays: list[tuple[str, datetime]],
+    next_index: int,
+    total: int,
+    last_item: Optional[tuple[Optional[datetime], str]] = None,
+    completed: bool = False
+) -> dict:
+    """
+    Importe une page d'historique Jellyfin en une transaction, checkpoint compris :
+    un import interrompu reprend après le dernier item écrit (last_item : DateCreated, Id).
+    rows : contenus de la page (cf. JellyfinSync.item_to_row), plays : (content_id, date de visionnage).
+    Un visionnage est ignoré si l'utilisateur a déjà un watchlog pour ce contenu, ou si sa dedupe_key existe.
+    content_genres et content_stats sont tenus à jour page par page, pour les seules lignes insérées ;
+    pas d'outbox : on ne demande pas de noter l'historique.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.execute(mysql_insert(User).prefix_with("IGNORE").values(jellyfin_id=user_id, username=username))
+        # Contenus pas encore synchronisés : leur hash ne changera pas au prochain sync,
+        # leurs genres sont donc écrits ici
+        if rows:
+            present = {
+                content_id for (content_id,) in db.query(Content.id)
+                    .filter(Content.id.in_([row["id"] for row in rows]))
+            }
+            new_rows = [row for row in rows if row["id"] not in present]
+            if new_rows:
+                db.execute(mysql_insert(Content).prefix_with("IGNORE").values(new_rows))
+                _replace_content_genres(db, {row["id"]: row.get("genres") for row in new_rows})
+        
+        inserted = 0
+        if plays:
+            existing = {
+                content_id for (content_id,) in db.query(Watchlog.content_id)
+                    .filter(Watchlog.user_id == user_id, Watchlog.content_id.in_([content_id for content_id, _ in plays]))
+                    .distinct()
+            }
+            new_watchlogs = [
+                {
+                    "user_id": user_id,
+                    "content_id": content_id,
+                    "watched_at": watched_at,
+                    "dedupe_key": playback_dedupe_key(user_id, content_id, watched_at)
+                }
+                for content_id, watched_at in plays
+                if content_id not in existing
+            ]
+            if new_watchlogs:
+                # Un seul INSERT multi-lignes ; IGNORE couvre les dedupe_key déjà présentes (webhook concurrent)
+                inserted = db.execute(mysql_insert(Watchlog).prefix_with("IGNORE").values(new_watchlogs)).rowcount
+            if inserted:
+                # Lignes de cet INSERT seulement (ids à partir du premier généré) : un watchlog
+                # écrit entre-temps par le webhook a déjà été compté dans content_stats
+                first_id = db.execute(text("SELECT LAST_INSERT_ID()")).scalar()
+                written = db.query(Watchlog.content_id, Watchlog.watched_at)\
+                    .filter(
+                        Watchlog.dedupe_key.in_([watchlog["dedupe_key"] for watchlog in new_watchlogs]),
+                        Watchlog.id >= first_id
+                    )\
+                    .all()
+                _record_watch_stats(db, written)
+        skipped = len(plays) - inserted
+        
+        state = mysql_insert(HistoryImportState).values(
+            user_id=user_id,
+            item_type=item_type,
+            next_index=next_index,
+            total=total,
+            last_created_at=last_item[0] if last_item else None,
+            last_item_id=last_item[1] if last_item else None,
+            imported=inserted,
+            skipped=skipped,
+            updated_at=now,
+            completed_at=now if completed else None
+        )
+        db.execute(state.on_duplicate_key_update(
+            next_index=state.inserted.next_index,
+            total=state.inserted.total,
+            # Page vide : le checkpoint précédent reste valable
+            last_created_at=func.coalesce(state.inserted.last_created_at, HistoryImportState.last_created_at),
+            last_item_id=func.coalesce(state.inserted.last_item_id, HistoryImportState.last_item_id),
+            imported=HistoryImportState.imported + inserted,
+            skipped=HistoryImportState.skipped + skipped,
+            updated_at=state.inserted.updated_at,
+            completed_at=state.inserted.completed_at
+        ))
+        db.commit()
+        if inserted:
+            invalidate_stats([user_id])
+        return {"imported": inserted, "skipped": skipped}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,52 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+
+from config.settings import settings
+from src.services.metrics import query_label
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Pool de threads dédié aux appels SQLAlchemy synchrones.
+# Borné pour ne jamais demander plus de connexions que le pool de l'engine.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.db_executor_workers,
+    thread_name_prefix="giorgio-db"
+)
+
+
+async def run_db(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Exécute une fonction BDD bloquante dans le pool dédié,
+    sans bloquer l'event loop appelante (FastAPI ou bot Discord).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(_labelled, func, *args, **kwargs))
+
+
+def _labelled(func: Callable[..., T], *args, **kwargs) -> T:
+    """Exécute func dans le thread du pool en étiquetant ses requêtes SQL par son nom"""
+    token = query_label.set(func.__name__)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        query_label.reset(token)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """BDD injoignable, connexion perdue ou pool saturé : réessayer plus tard, pas la faute des données"""
+    if isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+def shutdown_executor():
+    """Attend la fin des requêtes en cours puis libère les threads"""
+    _executor.shutdown(wait=True)
+    logger.info("🧵 Database executor stopped")
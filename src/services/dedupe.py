@@ -0,0 +1,72 @@
+from datetime import datetime, timezone
+from typing import Iterable
+import hashlib
+
+from config.settings import settings
+from src.services.cache import TTLCache
+
+
+def _bucket(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp()) // settings.webhook_dedupe_window_seconds
+
+
+def _key(user_id: str, item_id: str, bucket: int) -> str:
+    return hashlib.sha1(f"{user_id}:{item_id}:{bucket}".encode()).hexdigest()
+
+
+def playback_dedupe_key(user_id: str, item_id: str, timestamp: datetime) -> str:
+    """
+    Clé d'idempotence d'un visionnage : (utilisateur, item, horodatage arrondi à la fenêtre).
+    Les doublons envoyés par Jellyfin (retries, sessions multiples) tombent dans la même fenêtre
+    ou dans une fenêtre voisine (cf. adjacent_dedupe_keys).
+    """
+    return _key(user_id, item_id, _bucket(timestamp))
+
+
+def adjacent_dedupe_keys(user_id: str, item_id: str, timestamp: datetime) -> list[str]:
+    """
+    Clés des fenêtres précédente et suivante : un retry arrivé juste après une frontière
+    (00:04:59 puis 00:05:01) a une autre clé, mais reste un doublon.
+    """
+    bucket = _bucket(timestamp)
+    return [_key(user_id, item_id, bucket - 1), _key(user_id, item_id, bucket + 1)]
+
+
+class RecentEvents:
+    """
+    Index borné des événements récents : rejette un doublon en O(1) avant la BDD et Discord.
+    La contrainte unique sur watchlogs.dedupe_key reste la source de vérité.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._seen = TTLCache(max_entries, ttl_seconds)
+        self.memory_duplicates = 0
+        self.database_duplicates = 0
+    
+    def is_duplicate(self, keys: Iterable[str]) -> bool:
+        """True si l'une des clés (celle de l'event et ses voisines) a déjà été acceptée récemment"""
+        if any(self._seen.get(key) is not None for key in keys):
+            self.memory_duplicates += 1
+            return True
+        return False
+    
+    def mark(self, key: str):
+        """Enregistre une clé, une fois l'event réellement accepté dans la file d'ingestion"""
+        self._seen.set(key, True)
+    
+    def forget(self, key: str):
+        """Oublie une clé dont l'event n'a pas été écrit : un retry de Jellyfin doit passer"""
+        self._seen.delete(key)
+    
+    def stats(self) -> dict:
+        return {
+            "entries": self._seen.stats()["entries"],
+            "memory_duplicates": self.memory_duplicates,
+            "database_duplicates": self.database_duplicates
+        }
+
+
+# Instance globale
+recent_events = RecentEvents(settings.webhook_dedupe_max_entries, settings.webhook_dedupe_window_seconds * 2)
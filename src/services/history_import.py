@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+import httpx
+
+from config.settings import settings
+from src.models.database import HistoryImportState
+from src.services import database_service
+from src.services.db_executor import run_db
+from src.services.jellyfin_sync import ITEM_FIELDS, jellyfin_sync
+
+logger = logging.getLogger(__name__)
+
+# Types importés : type d'item Jellyfin → type de contenu Giorgio
+ITEM_TYPES = {"Movie": "movie", "Episode": "episode"}
+
+
+def parse_jellyfin_date(value: Optional[str]) -> Optional[datetime]:
+    """Date Jellyfin ('2024-03-01T20:15:42.1234567Z') → datetime UTC naïf, comme en base"""
+    if not value:
+        return None
+    value = value.rstrip("Z")
+    if "." in value:
+        # Jellyfin envoie 7 décimales, fromisoformat en accepte 6
+        head, fraction = value.split(".", 1)
+        value = f"{head}.{fraction[:6]}"
+    return datetime.fromisoformat(value)
+
+
+class HistoryImporter:
+    """
+    Importe l'historique de visionnage déjà connu de Jellyfin (UserData.Played / LastPlayedDate).
+    Les utilisateurs sont parcourus en parallèle, leurs pages par fenêtres concurrentes ;
+    chaque page est écrite en une transaction courte avec son checkpoint, l'import est donc
+    reprenable et ne monopolise ni la BDD ni le pool au détriment du webhook.
+    """
+    
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.totals = {"users": 0, "pages": 0, "imported": 0, "skipped": 0, "undated": 0, "failed": 0}
+    
+    async def _fetch_users(self, client: httpx.AsyncClient) -> list[dict]:
+        response = await client.get(f"{jellyfin_sync.base_url}/Users", headers=jellyfin_sync.headers)
+        response.raise_for_status()
+        return response.json()
+    
+    async def _write_page(self, user: dict, item_type: str, items: list, next_index: int, total: int):
+        content_type = ITEM_TYPES[item_type]
+        rows, plays = [], []
+        for item in items:
+            try:
+                row = jellyfin_sync.item_to_row(item, content_type)
+            except Exception as e:
+                logger.error(f"❌ Failed to parse {content_type} {item.get('Name')}: {e}")
+                continue
+            watched_at = parse_jellyfin_date((item.get("UserData") or {}).get("LastPlayedDate"))
+            if watched_at is None:
+                # Marqué "vu" à la main, sans date : rien à mettre dans l'historique
+                self.totals["undated"] += 1
+                continue
+            rows.append(row)
+            plays.append((row["id"], watched_at))
+        
+        last_item = None
+        if items:
+            last_item = (parse_jellyfin_date(items[-1].get("DateCreated")), items[-1]["Id"])
+        result = await run_db(
+            database_service.import_watch_history,
+            user["Id"],
+            user["Name"],
+            item_type,
+            rows,
+            plays,
+            next_index,
+            total,
+            last_item=last_item,
+            completed=next_index >= total
+        )
+        self.totals["pages"] += 1
+        self.totals["imported"] += result["imported"]
+        self.totals["skipped"] += result["skipped"]
+    
+    @staticmethod
+    def _imported(item: dict, state: HistoryImportState) -> bool:
+        """
+        Item déjà traité par un passage précédent : avant le checkpoint dans l'ordre DateCreated.
+        Les items de même date que le checkpoint sont refaits (sans risque : les visionnages connus sont ignorés).
+        """
+        if item["Id"] == state.last_item_id:
+            return True
+        created_at = parse_jellyfin_date(item.get("DateCreated"))
+        return created_at is not None and created_at < state.last_created_at
+    
+    async def _resume_index(self, client: httpx.AsyncClient, item_type: str, state: Optional[HistoryImportState], params: dict) -> int:
+        """
+        StartIndex où reprendre. La liste IsPlayed change entre deux passages (items supprimés ou marqués
+        non vus) : l'offset sauvegardé peut désormais pointer après des items jamais importés.
+        On recule page par page depuis l'offset jusqu'à retrouver le checkpoint (DateCreated, Id).
+        """
+        if not state:
+            return 0
+        page_size = settings.sync_page_size
+        if state.last_created_at is None:
+            # Checkpoint sans clé de tri : on refait la dernière page
+            return max(0, state.next_index - page_size)
+        
+        index = state.next_index
+        while index > 0:
+            start = max(0, index - page_size)
+            items = (await jellyfin_sync.fetch_page(client, item_type, start, params)).get("Items", [])
+            if items and (start == 0 or self._imported(items[0], state)):
+                # Liste triée : les items déjà faits sont en tête de page ; reprise au premier qui ne l'est pas
+                done = next((i for i, item in enumerate(items) if not self._imported(item, state)), len(items))
+                return start + done
+            index = start
+        return 0
+    
+    async def _import(self, client: httpx.AsyncClient, user: dict, item_type: str, state: Optional[HistoryImportState]):
+        """Importe les pages d'un utilisateur pour un type, dans l'ordre, depuis le checkpoint"""
+        page_size = settings.sync_page_size
+        params = {"userId": user["Id"], "Filters": "IsPlayed", "EnableUserData": "true", "Fields": f"{ITEM_FIELDS},DateCreated"}
+        start_index = await self._resume_index(client, item_type, state, params)
+        
+        first_page = await jellyfin_sync.fetch_page(client, item_type, start_index, params)
+        total = first_page.get("TotalRecordCount", 0)
+        await self._write_page(user, item_type, first_page.get("Items", []), start_index + page_size, total)
+        del first_page
+        
+        starts = list(range(start_index + page_size, total, page_size))
+        for i in range(0, len(starts), settings.sync_page_concurrency):
+            window = starts[i:i + settings.sync_page_concurrency]
+            # Une page en échec (après retries) arrête cet import : le checkpoint pointe sur elle
+            pages = await asyncio.gather(*(jellyfin_sync.fetch_page(client, item_type, start, params) for start in window))
+            for start, page in zip(window, pages):
+                await self._write_page(user, item_type, page.get("Items", []), start + page_size, total)
+    
+    async def _import_user(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, user: dict, states: dict):
+        async with semaphore:
+            for item_type in ITEM_TYPES:
+                state = states.get((user["Id"], item_type))
+                if state and state.completed_at:
+                    continue
+                try:
+                    await self._import(client, user, item_type, state)
+                    logger.info(f"📚 {user['Name']}: {item_type} history imported")
+                except Exception as e:
+                    self.totals["failed"] += 1
+                    logger.error(f"❌ {user['Name']}: {item_type} history import stopped, rerun to resume: {e}")
+    
+    async def run(self, restart: bool = False) -> dict:
+        """Importe l'historique de tous les utilisateurs (content_stats est tenu à jour page par page)"""
+        started = time.perf_counter()
+        if restart:
+            await run_db(database_service.reset_history_import)
+        states = await run_db(database_service.get_history_import_states)
+        
+        async with httpx.AsyncClient(timeout=settings.sync_page_timeout) as client:
+            users = await self._fetch_users(client)
+            self.totals["users"] = len(users)
+            semaphore = asyncio.Semaphore(self.concurrency)
+            await asyncio.gather(*(self._import_user(client, semaphore, user, states) for user in users))
+        
+        self.totals["duration_seconds"] = round(time.perf_counter() - started, 1)
+        logger.info(
+            f"🎉 History import done in {self.totals['duration_seconds']}s: "
+            f"{self.totals['imported']} imported, {self.totals['skipped']} skipped, {self.totals['undated']} undated"
+        )
+        return self.totals
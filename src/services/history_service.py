@@ -0,0 +1,85 @@
+from sqlalchemy import and_, or_, select
+from datetime import datetime
+from typing import Optional
+import base64
+
+from src.models.database import SessionLocal, User, Content, Watchlog
+
+# Colonnes exportées, dans l'ordre du CSV
+HISTORY_COLUMNS = ("id", "watched_at", "user_id", "username", "content_id", "content_title", "content_type", "rating", "rated_at")
+
+
+def encode_cursor(watched_at: datetime, watchlog_id: int) -> str:
+    """Curseur opaque sur la clé de tri (watched_at, id)"""
+    return base64.urlsafe_b64encode(f"{watched_at.isoformat()}|{watchlog_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Lève ValueError si le curseur est invalide"""
+    try:
+        watched_at, watchlog_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(watched_at), int(watchlog_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _history_select(user_id: Optional[str], content_type: Optional[str], since: Optional[datetime], until: Optional[datetime]):
+    """SELECT des colonnes de l'historique, filtré, du plus récent au plus ancien"""
+    stmt = select(
+        Watchlog.id,
+        Watchlog.watched_at,
+        Watchlog.user_id,
+        User.username,
+        Watchlog.content_id,
+        Content.title.label("content_title"),
+        Content.type.label("content_type"),
+        Watchlog.rating,
+        Watchlog.rated_at
+    ).join(User, Watchlog.user_id == User.jellyfin_id)\
+     .join(Content, Watchlog.content_id == Content.id)\
+     .order_by(Watchlog.watched_at.desc(), Watchlog.id.desc())
+    
+    if user_id:
+        stmt = stmt.where(Watchlog.user_id == user_id)
+    if content_type:
+        stmt = stmt.where(Content.type == content_type)
+    if since:
+        stmt = stmt.where(Watchlog.watched_at >= since)
+    if until:
+        stmt = stmt.where(Watchlog.watched_at < until)
+    return stmt
+
+
+def get_history_page(
+    limit: int,
+    cursor: Optional[str] = None,
+    user_id: Optional[str] = None,
+    content_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> dict:
+    """
+    Une page d'historique, paginée par keyset : la page suivante reprend après (watched_at, id)
+    du dernier élément, sans OFFSET (coût constant quelle que soit la profondeur).
+    """
+    stmt = _history_select(user_id, content_type, since, until)
+    if cursor:
+        watched_at, watchlog_id = decode_cursor(cursor)
+        # Forme développée plutôt qu'une comparaison de tuples : MariaDB l'utilise en range sur l'index
+        stmt = stmt.where(or_(
+            Watchlog.watched_at < watched_at,
+            and_(Watchlog.watched_at == watched_at, Watchlog.id < watchlog_id)
+        ))
+    
+    db = SessionLocal()
+    try:
+        rows = db.execute(stmt.limit(limit + 1)).mappings().all()
+    finally:
+        db.close()
+    
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["watched_at"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,206 @@
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from config.settings import settings
+from src.bot.discord_bot import notify_rating_request
+from src.services import database_service
+from src.services.db_executor import is_transient_error, run_db
+from src.services.dedupe import recent_events
+from src.services.metrics import WEBHOOK_PHASE
+
+logger = logging.getLogger(__name__)
+
+# Temps laissé au consommateur pour vider la file à l'arrêt
+DRAIN_TIMEOUT_SECONDS = 30
+# Premier délai avant de réessayer un lot quand la BDD est indisponible (doublé ensuite)
+RETRY_BASE_SECONDS = 1
+
+
+class IngestQueue:
+    """
+    File des visionnages reçus par le webhook.
+    Le webhook dépose l'event et répond tout de suite ; un consommateur en tâche de fond
+    les écrit par micro-lots (une transaction et un INSERT multi-lignes par lot).
+    """
+    
+    def __init__(self, max_size: int, batch_size: int, max_wait_seconds: float):
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._consumer: Optional[asyncio.Task] = None
+        self._accepting = True
+        
+        # Métriques
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.retrying = False
+        self.consumer_errors = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_depth = 0
+        self.last_lag_seconds = None
+        self.max_lag_seconds = 0.0
+    
+    def submit(self, event: dict) -> bool:
+        """Dépose un visionnage (kwargs de record_playback) ; False si la file est pleine ou fermée"""
+        if not self._accepting:
+            self.rejected += 1
+            return False
+        try:
+            self.queue.put_nowait((time.monotonic(), event))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.error("❌ Ingest queue full, rejecting webhook event")
+            return False
+        self.accepted += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+    
+    def start(self):
+        self._consumer = asyncio.create_task(self._run())
+    
+    async def drain(self):
+        """Arrêt propre : refuse les nouveaux events, écrit ceux en attente, puis arrête le consommateur"""
+        self._accepting = False
+        if self._consumer:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=DRAIN_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Ingest queue not drained after {DRAIN_TIMEOUT_SECONDS}s, {self.queue.qsize()} events lost")
+            self._consumer.cancel()
+        logger.info(f"📥 Ingest queue drained ({self.written} events written)")
+    
+    async def _next_batch(self) -> list:
+        """Attend un premier event, puis complète le lot pendant max_wait_seconds au plus"""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    def alive(self) -> bool:
+        """False si le consommateur s'est arrêté : la file ne se viderait plus"""
+        return self._consumer is not None and not self._consumer.done()
+    
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            except Exception as e:
+                # Le consommateur doit survivre à tout : sinon la file se remplit et chaque webhook reçoit 503
+                self.consumer_errors += 1
+                logger.exception(f"❌ Ingest consumer error on a batch of {len(batch)} events: {e}")
+                for _, event in batch:
+                    recent_events.forget(event["dedupe_key"])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    async def _record(self, events: list) -> list:
+        """
+        Écrit un lot ; si une erreur non transitoire le fait échouer, isole l'event fautif
+        en réécrivant les autres un par un. Les erreurs transitoires remontent à l'appelant.
+        """
+        try:
+            return await run_db(database_service.record_playbacks, events)
+        except Exception as e:
+            if is_transient_error(e):
+                raise
+            logger.error(f"❌ Batch of {len(events)} playbacks failed, retrying one by one: {e}")
+        
+        records = []
+        for event in events:
+            try:
+                # Un conflit sur dedupe_key (autre worker, tentative précédente) est vu par le SELECT
+                records.extend(await run_db(database_service.record_playbacks, [event]))
+            except Exception as e:
+                if is_transient_error(e):
+                    raise
+                self.failed += 1
+                recent_events.forget(event["dedupe_key"])
+                logger.error(f"❌ Failed to record playback {event['user_id']} → {event['content_id']}: {e}")
+        return records
+    
+    async def _record_with_retry(self, events: list) -> list:
+        """
+        Les events ont déjà été acquittés (202) : tant que la BDD est indisponible,
+        le lot est gardé et réessayé avec un délai croissant borné.
+        La file se remplit pendant ce temps et le webhook répond 503, que Jellyfin réessaie.
+        """
+        delay = RETRY_BASE_SECONDS
+        while True:
+            try:
+                records = await self._record(events)
+                if self.retrying:
+                    logger.info(f"✅ Database back, batch of {len(events)} playbacks written")
+                self.retrying = False
+                return records
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                self.retries += 1
+                self.retrying = True
+                logger.warning(f"⚠️ Database unavailable, retrying {len(events)} playbacks in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.ingest_retry_max_seconds)
+    
+    async def _write(self, batch: list):
+        events = [event for _, event in batch]
+        started = time.perf_counter()
+        records = await self._record_with_retry(events)
+        
+        WEBHOOK_PHASE.labels("db").observe(time.perf_counter() - started)
+        
+        duplicates = sum(1 for record in records if record is None)
+        records = [record for record in records if record is not None]
+        recent_events.database_duplicates += duplicates
+        
+        now = time.monotonic()
+        lag = max(now - received_at for received_at, _ in batch)
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        self.written += len(records)
+        self.last_lag_seconds = round(lag, 3)
+        self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+        
+        for record in records:
+            if record.outbox_id:
+                notify_rating_request(record.outbox_id)
+    
+    def stats(self) -> dict:
+        """Compteurs pour le monitoring"""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_max_size": self.queue.maxsize,
+            "max_depth": self.max_depth,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+            "retrying": self.retrying,
+            "consumer_alive": self.alive(),
+            "consumer_errors": self.consumer_errors,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_size": round(self.written / self.batches, 2) if self.batches else None,
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "deduplicated": recent_events.stats()
+        }
+
+
+# Instance globale
+ingest_queue = IngestQueue(settings.ingest_queue_size, settings.ingest_batch_size, settings.ingest_max_wait_seconds)
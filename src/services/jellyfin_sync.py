@@ -1,14 +1,21 @@
 import httpx
 import asyncio
 import logging
-from typing import Optional
-from datetime import datetime
+from typing import AsyncIterator, Optional
+from datetime import datetime, timedelta
 
 from config.settings import settings
 from src.services import database_service
+from src.services.db_executor import is_transient_error, run_db
+from src.services.metrics import SYNC_DURATION, SYNC_ITEMS
 
 logger = logging.getLogger(__name__)
 
+# Recouvrement appliqué au watermark lors d'un sync incrémental
+WATERMARK_OVERLAP = timedelta(minutes=5)
+# Champs demandés à /Items (l'import d'historique y ajoute DateCreated)
+ITEM_FIELDS = "Genres,ProviderIds,RunTimeTicks,ProductionYear,SeriesName,ParentIndexNumber,IndexNumber"
+
 
 class JellyfinSync:
     """Service de synchronisation du catalogue Jellyfin"""
@@ -19,27 +26,77 @@ class JellyfinSync:
             "Authorization": f"MediaBrowser Token={settings.jellyfin_api_key.get_secret_value()}",
             "Content-Type": "application/json"
         }
+        
+        # État exposé par /ready
+        self.running = False
+        self.runs = 0
+        self.last_mode = None
+        self.last_finished_at = None
+        self.last_error = None
     
-    async def get_all_items(self, item_type: str) -> list:
-        """Récupère tous les items d'un type (Movie ou Episode)"""
-        async with httpx.AsyncClient() as client:
+    async def fetch_page(self, client: httpx.AsyncClient, item_type: str, start_index: int, extra_params: Optional[dict] = None) -> dict:
+        """Récupère une page de /Items, avec quelques tentatives en cas d'échec"""
+        params = {
+            "IncludeItemTypes": item_type,
+            "Recursive": "true",
+            "Fields": ITEM_FIELDS,
+            # Ordre stable pour que la pagination ne saute pas d'items
+            "SortBy": "DateCreated,SortName",
+            "SortOrder": "Ascending",
+            "StartIndex": start_index,
+            "Limit": settings.sync_page_size,
+            "EnableImages": "false",
+            "EnableUserData": "false",
+            **(extra_params or {})
+        }
+        
+        retries = settings.sync_page_retries
+        for attempt in range(1, retries + 1):
             try:
-                response = await client.get(
-                    f"{self.base_url}/Items",
-                    headers=self.headers,
-                    params={
-                        "IncludeItemTypes": item_type,
-                        "Recursive": "true",
-                        "Fields": "Genres,ProviderIds,RunTimeTicks,ProductionYear,SeriesName,ParentIndexNumber,IndexNumber"
-                    },
-                    timeout=60.0
-                )
+                response = await client.get(f"{self.base_url}/Items", headers=self.headers, params=params)
                 response.raise_for_status()
-                data = response.json()
-                return data.get("Items", [])
+                return response.json()
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"⚠️ {item_type} page @{start_index} failed (attempt {attempt}/{retries}): {e}")
+                await asyncio.sleep(2 ** attempt)
+    
+    async def iter_items(self, item_type: str, counters: dict, extra_params: Optional[dict] = None) -> AsyncIterator[list]:
+        """
+        Parcourt les items d'un type (Movie ou Episode) page par page.
+        Les pages sont téléchargées par petites fenêtres concurrentes et rendues dans l'ordre,
+        la mémoire reste donc bornée à sync_page_concurrency pages.
+        Une page en échec est comptée dans counters["failed_pages"] sans interrompre le parcours.
+        """
+        page_size = settings.sync_page_size
+        concurrency = settings.sync_page_concurrency
+        
+        async with httpx.AsyncClient(timeout=settings.sync_page_timeout) as client:
+            try:
+                first_page = await self.fetch_page(client, item_type, 0, extra_params)
             except Exception as e:
+                counters["failed_pages"] += 1
                 logger.error(f"❌ Failed to fetch {item_type}s: {e}")
-                return []
+                return
+            
+            total = first_page.get("TotalRecordCount", 0)
+            yield first_page.get("Items", [])
+            del first_page
+            
+            starts = list(range(page_size, total, page_size))
+            for i in range(0, len(starts), concurrency):
+                window = starts[i:i + concurrency]
+                pages = await asyncio.gather(
+                    *(self.fetch_page(client, item_type, start, extra_params) for start in window),
+                    return_exceptions=True
+                )
+                for start, page in zip(window, pages):
+                    if isinstance(page, Exception):
+                        counters["failed_pages"] += 1
+                        logger.error(f"❌ Failed to fetch {item_type} page @{start}: {page}")
+                        continue
+                    yield page.get("Items", [])
     
     def _format_episode_title(self, item: dict) -> str:
         """Formate le titre d'un épisode: 'Breaking Bad S01E05'"""
@@ -54,85 +111,237 @@ class JellyfinSync:
             return None
         return int(ticks / 10_000_000 / 60)
     
-    async def sync_movies(self) -> int:
-        """Synchronise tous les films"""
-        logger.info("🎬 Syncing movies...")
-        movies = await self.get_all_items("Movie")
-        count = 0
+    def item_to_row(self, item: dict, content_type: str) -> dict:
+        """Convertit un item Jellyfin en row pour la table contents"""
+        genres = item.get("Genres", [])
+        provider_ids = item.get("ProviderIds", {})
+        
+        if content_type == "episode":
+            title = self._format_episode_title(item)
+        else:
+            title = item.get("Name", "Unknown")
         
-        for movie in movies:
+        return {
+            "id": item["Id"],
+            "title": title,
+            "type": content_type,
+            "year": item.get("ProductionYear"),
+            "genres": genres if genres else None,
+            "tmdb_id": provider_ids.get("Tmdb"),
+            "length": self._ticks_to_minutes(item.get("RunTimeTicks"))
+        }
+    
+    async def _write_rows(self, rows: list, content_type: str, counters: dict, index: Optional[dict] = None):
+        """
+        Écrit des rows en base par lots (une transaction par lot).
+        Si un lot échoue à cause de ses données, il est réécrit ligne par ligne :
+        seules les lignes fautives sont perdues (comptées dans counters["rejected"]).
+        """
+        batch_size = settings.sync_batch_size
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
             try:
-                genres = movie.get("Genres", [])
-                provider_ids = movie.get("ProviderIds", {})
-                
-                database_service.get_or_create_content(
-                    content_id=movie["Id"],
-                    title=movie.get("Name", "Unknown"),
-                    content_type="movie",
-                    year=movie.get("ProductionYear"),
-                    genres=genres if genres else None,
-                    tmdb_id=provider_ids.get("Tmdb"),
-                    length=self._ticks_to_minutes(movie.get("RunTimeTicks"))
-                )
-                count += 1
+                results = [await run_db(database_service.bulk_upsert_contents, batch, index)]
             except Exception as e:
-                logger.error(f"❌ Failed to sync movie {movie.get('Name')}: {e}")
+                if is_transient_error(e):
+                    counters["failed"] += len(batch)
+                    logger.error(f"❌ Failed to sync {content_type} batch: {e}")
+                    continue
+                logger.error(f"❌ {content_type} batch of {len(batch)} failed, retrying row by row: {e}")
+                results = []
+                for row in batch:
+                    try:
+                        results.append(await run_db(database_service.bulk_upsert_contents, [row], index))
+                    except Exception as e:
+                        if is_transient_error(e):
+                            counters["failed"] += 1
+                        else:
+                            counters["rejected"] += 1
+                        logger.error(f"❌ Failed to sync {content_type} {row['id']} ({row['title']!r}): {e}")
+            for result in results:
+                for key, value in result.items():
+                    counters[key] += value
+            counters["total"] += sum(sum(result.values()) for result in results)
+    
+    async def _sync_items(self, item_type: str, content_type: str, since: Optional[datetime] = None) -> dict:
+        """
+        Synchronise les items d'un type, page par page.
+        Si since est fourni, ne demande que les items sauvegardés depuis (MinDateLastSaved).
+        Sinon (sync complet), compare au catalogue local chargé une seule fois en index
+        et soft-delete les contenus qui ont disparu de Jellyfin.
+        Le watermark et les suppressions ne s'appliquent que si toutes les pages ont été lues et écrites.
+        Une ligne rejetée par la BDD (données invalides) ne les bloque pas : elle échouerait à chaque
+        passage, et son id est bien vu (pas de soft-delete). Le prochain sync complet la retentera.
+        """
+        counters = {"total": 0, "inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "failed": 0, "rejected": 0, "failed_pages": 0}
+        started_at = datetime.utcnow()
+        full = since is None
+        
+        extra_params = None
+        index = None
+        seen_ids = set()
+        if full:
+            index = await run_db(database_service.load_content_index, content_type)
+        else:
+            # Petite marge pour absorber le décalage d'horloge avec Jellyfin
+            extra_params = {"MinDateLastSaved": (since - WATERMARK_OVERLAP).isoformat() + "Z"}
         
-        logger.info(f"✅ Synced {count} movies")
-        return count
+        async for items in self.iter_items(item_type, counters, extra_params):
+            rows = []
+            for item in items:
+                try:
+                    rows.append(self.item_to_row(item, content_type))
+                except Exception as e:
+                    counters["failed"] += 1
+                    logger.error(f"❌ Failed to parse {content_type} {item.get('Name')}: {e}")
+            if full:
+                seen_ids.update(row["id"] for row in rows)
+            await self._write_rows(rows, content_type, counters, index)
+        
+        for result, value in counters.items():
+            SYNC_ITEMS.labels(item_type, result).inc(value)
+        
+        if counters["rejected"]:
+            logger.warning(f"⚠️ {item_type} sync: {counters['rejected']} item(s) rejected by the database, skipped")
+        if counters["failed_pages"] or counters["failed"]:
+            logger.warning(f"⚠️ {item_type} sync incomplete ({counters['failed_pages']} page(s), {counters['failed']} item(s) failed), watermark kept")
+            return counters
+        
+        if full:
+            counters["deleted"] = await self._reconcile_deletions(content_type, index, seen_ids)
+        await run_db(database_service.save_sync_watermark, item_type, started_at, full)
+        return counters
     
-    async def sync_episodes(self) -> int:
-        """Synchronise tous les épisodes"""
-        logger.info("📺 Syncing episodes...")
-        episodes = await self.get_all_items("Episode")
-        count = 0
+    async def _reconcile_deletions(self, content_type: str, index: dict, seen_ids: set) -> int:
+        """Soft-delete les contenus locaux absents de Jellyfin"""
+        active_ids = {content_id for content_id, digest in index.items() if digest is not None}
+        missing = list(active_ids - seen_ids)
+        if not missing:
+            return 0
         
-        for episode in episodes:
-            try:
-                genres = episode.get("Genres", [])
-                provider_ids = episode.get("ProviderIds", {})
-                
-                database_service.get_or_create_content(
-                    content_id=episode["Id"],
-                    title=self._format_episode_title(episode),
-                    content_type="episode",
-                    year=episode.get("ProductionYear"),
-                    genres=genres if genres else None,
-                    tmdb_id=provider_ids.get("Tmdb"),
-                    length=self._ticks_to_minutes(episode.get("RunTimeTicks"))
-                )
-                count += 1
-            except Exception as e:
-                logger.error(f"❌ Failed to sync episode: {e}")
+        # Garde-fou : une bibliothèque démontée ne doit pas vider le catalogue
+        if len(missing) > settings.sync_max_delete_ratio * len(active_ids):
+            logger.error(f"❌ Refusing to delete {len(missing)}/{len(active_ids)} {content_type}s, check the Jellyfin libraries")
+            return 0
         
-        logger.info(f"✅ Synced {count} episodes")
-        return count
+        return await run_db(database_service.soft_delete_contents, missing)
+    
+    async def sync_movies(self, since: Optional[datetime] = None) -> dict:
+        """Synchronise les films (tous, ou ceux modifiés depuis since)"""
+        logger.info("🎬 Syncing movies...")
+        counters = await self._sync_items("Movie", "movie", since)
+        logger.info(f"✅ Synced {counters['total']} movies ({counters['inserted']} new, {counters['updated']} updated, {counters['deleted']} deleted)")
+        return counters
+    
+    async def sync_episodes(self, since: Optional[datetime] = None) -> dict:
+        """Synchronise les épisodes (tous, ou ceux modifiés depuis since)"""
+        logger.info("📺 Syncing episodes...")
+        counters = await self._sync_items("Episode", "episode", since)
+        logger.info(f"✅ Synced {counters['total']} episodes ({counters['inserted']} new, {counters['updated']} updated, {counters['deleted']} deleted)")
+        return counters
     
     async def full_sync(self) -> dict:
         """Synchronisation complète du catalogue"""
         logger.info("🔄 Starting full catalog sync...")
         start_time = datetime.now()
         
-        movies_count = await self.sync_movies()
-        episodes_count = await self.sync_episodes()
+        movies = await self.sync_movies()
+        episodes = await self.sync_episodes()
+        
+        elapsed = datetime.now() - start_time
+        SYNC_DURATION.labels("full").observe(elapsed.total_seconds())
+        duration = elapsed.seconds
+        logger.info(f"🎉 Full sync completed in {duration}s: {movies['total']} movies, {episodes['total']} episodes")
+        
+        return {
+            "mode": "full",
+            "movies": movies,
+            "episodes": episodes,
+            "duration_seconds": duration
+        }
+    
+    async def incremental_sync(self) -> dict:
+        """Synchronise uniquement les items modifiés depuis le dernier sync réussi"""
+        logger.info("🔄 Starting incremental catalog sync...")
+        start_time = datetime.now()
+        
+        movies_state = await run_db(database_service.get_sync_state, "Movie")
+        episodes_state = await run_db(database_service.get_sync_state, "Episode")
         
-        duration = (datetime.now() - start_time).seconds
-        logger.info(f"🎉 Full sync completed in {duration}s: {movies_count} movies, {episodes_count} episodes")
+        # Sans watermark, le type est synchronisé entièrement
+        movies = await self.sync_movies(since=movies_state.last_sync_at if movies_state else None)
+        episodes = await self.sync_episodes(since=episodes_state.last_sync_at if episodes_state else None)
+        
+        elapsed = datetime.now() - start_time
+        SYNC_DURATION.labels("incremental").observe(elapsed.total_seconds())
+        duration = elapsed.seconds
+        logger.info(f"🎉 Incremental sync completed in {duration}s: {movies['total']} movies, {episodes['total']} episodes")
         
         return {
-            "movies": movies_count,
-            "episodes": episodes_count,
+            "mode": "incremental",
+            "movies": movies,
+            "episodes": episodes,
             "duration_seconds": duration
         }
+    
+    async def _full_sync_due(self) -> bool:
+        """Un sync complet est nécessaire s'il n'y en a jamais eu ou si le dernier est trop ancien"""
+        max_age = timedelta(hours=settings.full_sync_interval_hours)
+        for item_type in ("Movie", "Episode"):
+            state = await run_db(database_service.get_sync_state, item_type)
+            if not state or not state.last_sync_at or not state.last_full_sync_at:
+                return True
+            if datetime.utcnow() - state.last_full_sync_at >= max_age:
+                return True
+        return False
+    
+    async def sync(self) -> dict:
+        """Sync incrémental, ou complet quand il est dû"""
+        self.running = True
+        try:
+            if await self._full_sync_due():
+                result = await self.full_sync()
+            else:
+                result = await self.incremental_sync()
+            self.last_mode = result["mode"]
+            self.last_error = None
+            return result
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self.running = False
+            self.runs += 1
+            self.last_finished_at = datetime.utcnow()
+    
+    def state(self) -> dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "last_mode": self.last_mode,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_error": self.last_error
+        }
 
 
 # Instance globale
 jellyfin_sync = JellyfinSync()
 
 
-async def run_periodic_sync(interval_hours: int):
-    """Tâche de fond pour la synchronisation périodique"""
+async def _run_sync():
+    # Une erreur (Jellyfin ou BDD indisponible) ne doit pas arrêter la tâche de fond
+    try:
+        await jellyfin_sync.sync()
+    except Exception as e:
+        logger.error(f"❌ Catalog sync failed: {e}")
+
+
+async def run_periodic_sync(interval_hours: int, initial: bool = False):
+    """Tâche de fond : sync initial si demandé, puis synchronisation périodique"""
+    if initial:
+        logger.info("🔄 Initial catalog sync running in background")
+        await _run_sync()
     while True:
         await asyncio.sleep(interval_hours * 3600)
         logger.info(f"⏰ Periodic sync triggered (every {interval_hours}h)")
-        await jellyfin_sync.full_sync()
\ No newline at end of file
+        await _run_sync()
@@ -0,0 +1,98 @@
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+import os
+import socket
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from config.settings import settings
+from src.models.database import engine
+from src.services.db_executor import run_db
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Élection d'un leader entre workers / replicas via GET_LOCK de MariaDB.
+    Le verrou appartient à la session : il est gardé sur une connexion dédiée
+    et libéré automatiquement par le serveur si le process meurt.
+    """
+    
+    def __init__(self, lock_name: str, check_seconds: float):
+        self.lock_name = lock_name
+        self.check_seconds = check_seconds
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self._connection: Optional[Connection] = None
+        self.elections = 0
+        self.losses = 0
+    
+    def _try_acquire(self) -> bool:
+        if self._connection is None:
+            self._connection = engine.connect()
+        # Timeout 0 : on ne bloque pas, le prochain tour retentera
+        return self._connection.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": self.lock_name}).scalar() == 1
+    
+    def _still_held(self) -> bool:
+        return self._connection.execute(
+            text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"), {"name": self.lock_name}
+        ).scalar() == 1
+    
+    def _close(self):
+        if self._connection is None:
+            return
+        try:
+            if self.is_leader:
+                self._connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.lock_name})
+            self._connection.close()
+        except Exception:
+            # Connexion déjà morte : le serveur a libéré le verrou avec la session
+            self._connection.invalidate()
+        finally:
+            self._connection = None
+    
+    async def run(self, on_elected: Callable[[], Awaitable[None]], on_lost: Callable[[], Awaitable[None]]):
+        """Tente d'obtenir le verrou, puis vérifie qu'il est toujours détenu, toutes les check_seconds"""
+        while True:
+            try:
+                if self.is_leader:
+                    held = await run_db(self._still_held)
+                else:
+                    held = await run_db(self._try_acquire)
+            except Exception as e:
+                logger.error(f"❌ Leader election check failed: {e}")
+                held = False
+                await run_db(self._close)
+            
+            if held and not self.is_leader:
+                self.is_leader = True
+                self.elections += 1
+                logger.info(f"👑 {self.identity} elected leader")
+                await on_elected()
+            elif not held and self.is_leader:
+                self.is_leader = False
+                self.losses += 1
+                logger.warning(f"⚠️ {self.identity} lost leadership")
+                await on_lost()
+            
+            await asyncio.sleep(self.check_seconds)
+    
+    async def resign(self):
+        """Libère le verrou (arrêt propre) pour qu'un autre worker prenne le relais"""
+        await run_db(self._close)
+        self.is_leader = False
+    
+    def stats(self) -> dict:
+        return {
+            "identity": self.identity,
+            "is_leader": self.is_leader,
+            "elections": self.elections,
+            "losses": self.losses
+        }
+
+
+# Instance globale
+leader = LeaderElection(settings.leader_lock_name, settings.leader_check_seconds)
@@ -0,0 +1,111 @@
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+# Opération BDD en cours (nom de la fonction passée à run_db), pour étiqueter les requêtes SQL
+query_label: ContextVar[str] = ContextVar("query_label", default="unlabelled")
+
+HTTP_LATENCY = Histogram(
+    "giorgio_http_request_duration_seconds",
+    "Latence des requêtes HTTP par route",
+    ["method", "route", "status"]
+)
+
+WEBHOOK_PHASE = Histogram(
+    "giorgio_webhook_phase_seconds",
+    "Temps passé par phase du traitement d'un visionnage (parse, handle, db par lot, discord par message)",
+    ["phase"]
+)
+
+DB_QUERY = Histogram(
+    "giorgio_db_query_seconds",
+    "Durée des requêtes SQL par opération",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+DB_POOL_WAIT = Histogram(
+    "giorgio_db_pool_wait_seconds",
+    "Attente d'une connexion libre dans le pool SQLAlchemy (checkout)",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+)
+
+SYNC_DURATION = Histogram(
+    "giorgio_sync_duration_seconds",
+    "Durée des synchronisations du catalogue",
+    ["mode"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+)
+
+SYNC_ITEMS = Counter(
+    "giorgio_sync_items",
+    "Items traités par le sync du catalogue",
+    ["item_type", "result"]
+)
+
+RATING_LATENCY = Histogram(
+    "giorgio_rating_seconds",
+    "Notes Discord : durée du callback (acquittement compris) et délai jusqu'au commit en base",
+    ["phase"]
+)
+
+# multiprocess_mode : agrégation entre workers quand PROMETHEUS_MULTIPROC_DIR est défini
+STARTUP = Gauge(
+    "giorgio_startup_seconds",
+    "Temps de démarrage depuis l'import de l'app (import, lifespan, première requête)",
+    ["phase"],
+    multiprocess_mode="liveall"
+)
+
+BOT_LATENCY = Gauge(
+    "giorgio_bot_gateway_latency_seconds",
+    "Latence du heartbeat de la gateway Discord (mise à jour par le bot du leader)",
+    multiprocess_mode="livemax"
+)
+
+
+def instrument_queries(engine):
+    """Chronomètre chaque requête SQL de l'engine, étiquetée par query_label"""
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        DB_QUERY.labels(query_label.get()).observe(time.perf_counter() - started)
+
+
+class SnapshotCollector:
+    """Exporte en gauges les compteurs numériques des snapshots JSON de /api/metrics"""
+    
+    def __init__(self, sources: dict[str, Callable[[], dict]], labels: Optional[dict[str, str]] = None):
+        self.sources = sources
+        self.labels = labels or {}
+    
+    def describe(self):
+        # Évite que l'enregistrement appelle collect() avant le démarrage de l'app
+        return []
+    
+    def collect(self):
+        for section, source in self.sources.items():
+            for key, value in _flatten(source()):
+                # bool est un int : ready/initialized deviennent 0/1
+                if isinstance(value, (int, float)):
+                    family = GaugeMetricFamily(f"giorgio_{section}_{key}", f"{section}.{key} (snapshot /api/metrics)", labels=list(self.labels))
+                    family.add_metric(list(self.labels.values()), value)
+                    yield family
+
+
+def _flatten(snapshot: dict, prefix: str = ""):
+    for key, value in snapshot.items():
+        name = f"{prefix}{key}".replace(".", "_")
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        else:
+            yield name, value
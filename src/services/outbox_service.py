@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+from typing import Optional
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from src.models.database import SessionLocal, NotificationOutbox, Watchlog
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _to_dict(row: NotificationOutbox) -> dict:
+    return {
+        "id": row.id,
+        "watchlog_id": row.watchlog_id,
+        "user_id": row.user_id,
+        "username": row.username,
+        "content_id": row.content_id,
+        "content_name": row.content_name,
+        "content_type": row.content_type,
+        "series_name": row.series_name,
+        "attempts": row.attempts,
+        "message_id": row.message_id,
+        "created_at": row.created_at,
+        "sent_at": row.sent_at
+    }
+
+
+def get_due_notifications(limit: int) -> list[dict]:
+    """Notifications en attente dont l'heure d'envoi est passée, les plus anciennes d'abord"""
+    db = SessionLocal()
+    try:
+        rows = db.query(NotificationOutbox)\
+            .filter(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= datetime.utcnow())\
+            .order_by(NotificationOutbox.id)\
+            .limit(limit)\
+            .all()
+        return [_to_dict(row) for row in rows]
+    finally:
+        db.close()
+
+
+def mark_sent(sent: dict[int, str]):
+    """Marque un lot de notifications comme envoyées (outbox id → message id Discord)"""
+    if not sent:
+        return
+    
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.bulk_update_mappings(NotificationOutbox, [
+            {"id": outbox_id, "status": "sent", "message_id": message_id, "sent_at": now, "last_error": None}
+            for outbox_id, message_id in sent.items()
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def mark_failed(outbox_id: int, error: str, retry_after: Optional[float] = None):
+    """
+    Enregistre un échec d'envoi et planifie la prochaine tentative (backoff exponentiel,
+    ou retry_after imposé par Discord). Abandonne après outbox_max_attempts.
+    """
+    db = SessionLocal()
+    try:
+        row = db.query(NotificationOutbox).filter(NotificationOutbox.id == outbox_id).first()
+        if not row:
+            return
+        
+        row.attempts += 1
+        row.last_error = error[:255]
+        if row.attempts >= settings.outbox_max_attempts:
+            row.status = "failed"
+            logger.error(f"❌ Giving up on rating request {outbox_id} after {row.attempts} attempts: {error}")
+        else:
+            delay = retry_after or min(settings.outbox_retry_base_seconds * 2 ** (row.attempts - 1), 3600)
+            row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_pending_views(max_age_hours: int) -> list[dict]:
+    """
+    Notifications envoyées récemment, avec leur statut de notation :
+    les vues encore ouvertes doivent être ré-attachées au redémarrage.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(NotificationOutbox, Watchlog.rating)\
+            .join(Watchlog, Watchlog.id == NotificationOutbox.watchlog_id)\
+            .filter(
+                NotificationOutbox.status == "sent",
+                NotificationOutbox.message_id.isnot(None),
+                NotificationOutbox.sent_at >= datetime.utcnow() - timedelta(hours=max_age_hours)
+            )\
+            .all()
+        return [{**_to_dict(row), "rated": rating is not None} for row, rating in rows]
+    finally:
+        db.close()
+
+
+def debounce_series(db: Session, user_id: str, series_name: str, now: datetime) -> datetime:
+    """
+    Repousse l'envoi des épisodes en attente d'une même série pour un utilisateur
+    (dans la transaction en cours) et retourne l'heure d'envoi commune du groupe.
+    La fenêtre glisse à chaque épisode, sans dépasser notification_debounce_max_minutes.
+    """
+    group = db.query(NotificationOutbox)\
+        .filter(
+            NotificationOutbox.user_id == user_id,
+            NotificationOutbox.series_name == series_name,
+            NotificationOutbox.status == "pending",
+            NotificationOutbox.attempts == 0
+        )
+    
+    send_at = now + timedelta(minutes=settings.notification_debounce_minutes)
+    oldest = group.with_entities(func.min(NotificationOutbox.created_at)).scalar()
+    if oldest:
+        send_at = min(send_at, oldest + timedelta(minutes=settings.notification_debounce_max_minutes))
+        group.update({NotificationOutbox.next_attempt_at: send_at}, synchronize_session=False)
+    return send_at
@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from typing import Callable
+import logging
+
+from sqlalchemy import event
+
+from src.models.database import engine
+from src.services import stats_service
+
+logger = logging.getLogger(__name__)
+
+# Requêtes surveillées : nom → appel du service
+STATS_QUERIES: dict[str, Callable] = {
+    "global_stats": stats_service.get_global_stats,
+    "most_watched": lambda: stats_service.get_most_watched(limit=10),
+    "top_rated": lambda: stats_service.get_top_rated(limit=10, min_ratings=1),
+    "recent_activity": lambda: stats_service.get_recent_activity(limit=10),
+    "user_stats": lambda: stats_service.get_user_stats(_any_user_id()),
+    "genre_stats": stats_service.get_genre_stats,
+    "user_genre_stats": lambda: stats_service.get_user_genre_stats(_any_user_id()),
+}
+
+# Tables sur lesquelles un full scan (EXPLAIN type = ALL) est refusé
+WATCHED_TABLES = {"watchlogs", "contents"}
+
+
+def _any_user_id() -> str:
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT jellyfin_id FROM users LIMIT 1").scalar() or ""
+
+
+@contextmanager
+def _capture_statements():
+    """Capture les requêtes SQL (et leurs paramètres) exécutées sur l'engine"""
+    captured = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+    
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain_stats_queries() -> list[dict]:
+    """
+    Exécute chaque requête de stats, puis son EXPLAIN.
+    Retourne une ligne par table accédée, avec full_scan=True si MariaDB lit toute la table.
+    """
+    report = []
+    for name, run in STATS_QUERIES.items():
+        with _capture_statements() as statements:
+            run()
+        
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                # La résolution de l'utilisateur de test n'est pas une requête de stats
+                if "FROM users LIMIT 1" in statement:
+                    continue
+                plan = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().all()
+                for row in plan:
+                    report.append({
+                        "query": name,
+                        "table": row["table"],
+                        "type": row["type"],
+                        "key": row["key"],
+                        "rows": row["rows"],
+                        "full_scan": row["type"] == "ALL" and row["table"] in WATCHED_TABLES
+                    })
+    return report
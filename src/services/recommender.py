@@ -0,0 +1,272 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+import asyncio
+import logging
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func
+
+from config.settings import settings
+from src.models.database import SessionLocal, Content, Watchlog
+from src.services.db_executor import run_db
+
+logger = logging.getLogger(__name__)
+
+# Lignes de la matrice de similarité calculées à la fois (mémoire bornée à CHUNK × nb de films)
+CHUNK_SIZE = 256
+# Poids d'un film vu mais pas noté dans le profil d'un utilisateur
+IMPLICIT_AFFINITY = 0.3
+# Nombre de notes "virtuelles" à la moyenne globale pour la popularité (moyenne bayésienne)
+POPULARITY_PRIOR = 3
+
+
+@dataclass
+class RecommenderModel:
+    """Top-K voisins de chaque film, précalculés hors du chemin des requêtes"""
+    ids: list[str]
+    titles: list[str]
+    years: list[Optional[int]]
+    position: dict[str, int]
+    neighbours: np.ndarray  # (films, K) indices des voisins
+    weights: np.ndarray  # (films, K) similarités associées
+    popularity: np.ndarray  # (films,) note moyenne bayésienne, départage et démarrage à froid
+    users: int
+    built_at: datetime
+    build_seconds: float
+
+
+def _normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.diags(inverse) @ matrix
+
+
+def _top_k(ratings: sparse.csr_matrix, genres: sparse.csr_matrix, top_k: int, rating_weight: float) -> tuple[np.ndarray, np.ndarray]:
+    """Similarité cosinus (notes centrées + genres) mélangée, réduite aux top_k voisins par film"""
+    n = ratings.shape[0]
+    k = min(top_k, n - 1)
+    neighbours = np.zeros((n, max(k, 0)), dtype=np.int32)
+    weights = np.zeros((n, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return neighbours, weights
+
+    ratings_t = ratings.T.tocsc()
+    genres_t = genres.T.tocsc()
+    for start in range(0, n, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, n)
+        block = rating_weight * (ratings[start:stop] @ ratings_t).toarray()
+        block += (1 - rating_weight) * (genres[start:stop] @ genres_t).toarray()
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # Pas soi-même
+
+        index = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        neighbours[start:stop] = index
+        # Une similarité négative n'est pas une recommandation
+        weights[start:stop] = np.maximum(np.take_along_axis(block, index, axis=1), 0)
+    return neighbours, weights
+
+
+def load_training_data() -> tuple[list, list]:
+    """Films du catalogue et notes des watchlogs (lecture BDD seule, via run_db)"""
+    db = SessionLocal()
+    try:
+        movies = db.query(Content.id, Content.title, Content.year, Content.genres)\
+            .filter(Content.type == "movie", Content.deleted_at.is_(None))\
+            .order_by(Content.id)\
+            .all()
+        if not movies:
+            return [], []
+
+        # Une note par (utilisateur, film) : moyenne des revisionnages
+        ratings = db.query(Watchlog.user_id, Watchlog.content_id, func.avg(Watchlog.rating))\
+            .join(Content, Content.id == Watchlog.content_id)\
+            .filter(Content.type == "movie", Content.deleted_at.is_(None), Watchlog.rating.isnot(None))\
+            .group_by(Watchlog.user_id, Watchlog.content_id)\
+            .all()
+        return movies, ratings
+    finally:
+        db.close()
+
+
+def load_user_history(user_id: str) -> list:
+    """(content_id, meilleure note) de chaque contenu vu par l'utilisateur (lecture BDD seule, via run_db)"""
+    db = SessionLocal()
+    try:
+        return db.query(Watchlog.content_id, func.max(Watchlog.rating))\
+            .filter(Watchlog.user_id == user_id)\
+            .group_by(Watchlog.content_id)\
+            .all()
+    finally:
+        db.close()
+
+
+def build_model(movies: list, ratings: list) -> Optional[RecommenderModel]:
+    """Construit le modèle depuis les notes des watchlogs et les genres des films (calcul seul, sans BDD)"""
+    if not movies:
+        return None
+    started = time.perf_counter()
+
+    position = {movie.id: i for i, movie in enumerate(movies)}
+    n = len(movies)
+
+    # Matrice films × utilisateurs, notes centrées sur la moyenne de chaque utilisateur (cosinus ajusté)
+    user_index = {}
+    rows, cols, values = [], [], []
+    for user_id, content_id, rating in ratings:
+        rows.append(position[content_id])
+        cols.append(user_index.setdefault(user_id, len(user_index)))
+        values.append(float(rating))
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    raw = np.asarray(values, dtype=np.float64)
+    values = raw
+    if len(values):
+        user_means = np.bincount(cols, weights=values) / np.bincount(cols)
+        values = values - user_means[cols]
+    rating_matrix = sparse.csr_matrix((values, (rows, cols)), shape=(n, max(len(user_index), 1)))
+
+    # One-hot des genres
+    genre_index = {}
+    genre_rows, genre_cols = [], []
+    for i, movie in enumerate(movies):
+        for genre in movie.genres or []:
+            genre_rows.append(i)
+            genre_cols.append(genre_index.setdefault(genre, len(genre_index)))
+    genre_matrix = sparse.csr_matrix(
+        (np.ones(len(genre_rows)), (genre_rows, genre_cols)),
+        shape=(n, max(len(genre_index), 1))
+    )
+
+    neighbours, weights = _top_k(
+        _normalize_rows(rating_matrix),
+        _normalize_rows(genre_matrix),
+        settings.recommender_top_k,
+        settings.recommender_rating_weight
+    )
+
+    counts = np.bincount(rows, minlength=n)
+    sums = np.bincount(rows, weights=raw, minlength=n)
+    global_mean = raw.mean() if len(raw) else 5.5
+    popularity = (sums + POPULARITY_PRIOR * global_mean) / (counts + POPULARITY_PRIOR)
+
+    return RecommenderModel(
+        ids=[movie.id for movie in movies],
+        titles=[movie.title for movie in movies],
+        years=[movie.year for movie in movies],
+        position=position,
+        neighbours=neighbours,
+        weights=weights,
+        popularity=popularity,
+        users=len(user_index),
+        built_at=datetime.utcnow(),
+        build_seconds=round(time.perf_counter() - started, 3)
+    )
+
+
+class Recommender:
+    """
+    Suggestions de films par filtrage item-item.
+    Le modèle est reconstruit en tâche de fond quand les notes ou le catalogue changent ;
+    une requête ne fait qu'un SELECT de l'historique et un score vectorisé.
+    Les lectures passent par run_db, le calcul NumPy/SciPy par asyncio.to_thread.
+    """
+
+    def __init__(self):
+        self.model: Optional[RecommenderModel] = None
+        self._dirty = threading.Event()
+        self._dirty.set()  # Premier build au démarrage
+        self.builds = 0
+
+    def mark_dirty(self):
+        """Demande une reconstruction (appelable depuis n'importe quel thread)"""
+        self._dirty.set()
+
+    async def refresh_if_dirty(self) -> bool:
+        if not self._dirty.is_set():
+            return False
+        self._dirty.clear()
+        movies, ratings = await run_db(load_training_data)
+        # Calcul NumPy/SciPy hors du pool BDD : un rebuild ne prend pas de thread au webhook ni aux stats
+        model = await asyncio.to_thread(build_model, movies, ratings)
+        # Remplacement atomique : les requêtes en cours gardent l'ancien modèle
+        self.model = model
+        self.builds += 1
+        if model:
+            logger.info(f"🧠 Recommender rebuilt in {model.build_seconds}s: {len(model.ids)} movies, {model.users} users")
+        return True
+    
+    async def suggest(self, user_id: Optional[str], limit: int) -> list[dict]:
+        """Films non vus les mieux notés pour l'utilisateur (populaires s'il n'a pas d'historique)"""
+        model = self.model
+        if model is None:
+            return []
+        history = await run_db(load_user_history, user_id) if user_id else []
+        return await asyncio.to_thread(self._score, model, history, limit)
+    
+    @staticmethod
+    def _score(model: RecommenderModel, history: list, limit: int) -> list[dict]:
+        """Score vectorisé des films non vus (calcul seul, hors du pool BDD)"""
+        seen, affinity = [], []
+        for content_id, rating in history:
+            i = model.position.get(content_id)
+            if i is None:
+                continue
+            seen.append(i)
+            # Note 1..10 ramenée dans [-1, 1] : un film détesté éloigne ses voisins
+            affinity.append((rating - 5.5) / 4.5 if rating is not None else IMPLICIT_AFFINITY)
+
+        seen = np.asarray(seen, dtype=np.int64)
+        contributions = model.weights[seen] * np.asarray(affinity, dtype=np.float32)[:, None]
+        scores = np.zeros(len(model.ids))
+        np.add.at(scores, model.neighbours[seen].ravel(), contributions.ravel())
+        scores[seen] = -np.inf  # Déjà vus
+
+        # Score d'abord, popularité pour départager (et seule pour un nouvel utilisateur)
+        ranking = np.lexsort((model.popularity, scores))[::-1]
+
+        suggestions = []
+        for j in ranking[:limit]:
+            if scores[j] == -np.inf:
+                break
+            because = None
+            if scores[j] > 0:
+                # Film vu qui a le plus contribué au score
+                contribution = np.where(model.neighbours[seen] == j, contributions, -np.inf).max(axis=1)
+                because = model.titles[seen[np.argmax(contribution)]]
+            suggestions.append({
+                "id": model.ids[j],
+                "title": model.titles[j],
+                "year": model.years[j],
+                "score": round(float(scores[j]), 3),
+                "because": because
+            })
+        return suggestions
+
+    def stats(self) -> dict:
+        model = self.model
+        return {
+            "movies": len(model.ids) if model else 0,
+            "users": model.users if model else 0,
+            "built_at": model.built_at.isoformat() if model else None,
+            "build_seconds": model.build_seconds if model else None,
+            "builds": self.builds,
+            "dirty": self._dirty.is_set()
+        }
+
+
+# Instance globale
+recommender = Recommender()
+
+
+async def run_recommender_refresh(interval_seconds: int):
+    """Tâche de fond : reconstruit le modèle quand des notes ou le catalogue ont changé"""
+    while True:
+        try:
+            await recommender.refresh_if_dirty()
+        except Exception as e:
+            recommender.mark_dirty()
+            logger.error(f"❌ Recommender rebuild failed: {e}")
+        await asyncio.sleep(interval_seconds)
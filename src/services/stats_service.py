@@ -1,14 +1,14 @@
-from sqlalchemy import func
+from sqlalchemy import case, func
 from typing import Optional
 import logging
 
-from src.models.database import SessionLocal, User, Content, Watchlog
+from src.models.database import SessionLocal, User, Content, Genre, ContentGenre, Watchlog, ContentStats
 
 logger = logging.getLogger(__name__)
 
 
 def get_most_watched(limit: int = 10) -> list:
-    """Top des contenus les plus vus"""
+    """Top des contenus les plus vus (lu dans content_stats)"""
     db = SessionLocal()
     try:
         results = db.query(
@@ -16,11 +16,11 @@ def get_most_watched(limit: int = 10) -> list:
             Content.title,
             Content.type,
             Content.year,
-            func.count(Watchlog.id).label("watch_count"),
-            func.avg(Watchlog.rating).label("avg_rating")
-        ).join(Watchlog, Content.id == Watchlog.content_id)\
-         .group_by(Content.id)\
-         .order_by(func.count(Watchlog.id).desc())\
+            ContentStats.watch_count,
+            ContentStats.avg_rating
+        ).join(Content, Content.id == ContentStats.content_id)\
+         .filter(ContentStats.watch_count > 0)\
+         .order_by(ContentStats.watch_count.desc())\
          .limit(limit)\
          .all()
         
@@ -40,7 +40,7 @@ def get_most_watched(limit: int = 10) -> list:
 
 
 def get_top_rated(limit: int = 10, min_ratings: int = 1) -> list:
-    """Top des contenus les mieux notés"""
+    """Top des contenus les mieux notés (lu dans content_stats)"""
     db = SessionLocal()
     try:
         results = db.query(
@@ -48,13 +48,11 @@ def get_top_rated(limit: int = 10, min_ratings: int = 1) -> list:
             Content.title,
             Content.type,
             Content.year,
-            func.avg(Watchlog.rating).label("avg_rating"),
-            func.count(Watchlog.rating).label("rating_count")
-        ).join(Watchlog, Content.id == Watchlog.content_id)\
-         .filter(Watchlog.rating.isnot(None))\
-         .group_by(Content.id)\
-         .having(func.count(Watchlog.rating) >= min_ratings)\
-         .order_by(func.avg(Watchlog.rating).desc())\
+            ContentStats.avg_rating,
+            ContentStats.rating_count
+        ).join(Content, Content.id == ContentStats.content_id)\
+         .filter(ContentStats.rating_count >= max(min_ratings, 1))\
+         .order_by(ContentStats.avg_rating.desc())\
          .limit(limit)\
          .all()
         
@@ -81,40 +79,25 @@ def get_user_stats(user_id: str) -> Optional[dict]:
         if not user:
             return None
         
-        # Nombre de visionnages
-        total_watched = db.query(func.count(Watchlog.id))\
-            .filter(Watchlog.user_id == user_id)\
-            .scalar()
-        
-        # Nombre de notes données
-        total_rated = db.query(func.count(Watchlog.id))\
-            .filter(Watchlog.user_id == user_id, Watchlog.rating.isnot(None))\
-            .scalar()
-        
-        # Note moyenne donnée
-        avg_rating = db.query(func.avg(Watchlog.rating))\
-            .filter(Watchlog.user_id == user_id, Watchlog.rating.isnot(None))\
-            .scalar()
-        
-        # Films vs Épisodes
-        movies_watched = db.query(func.count(Watchlog.id))\
-            .join(Content, Watchlog.content_id == Content.id)\
-            .filter(Watchlog.user_id == user_id, Content.type == "movie")\
-            .scalar()
-        
-        episodes_watched = db.query(func.count(Watchlog.id))\
-            .join(Content, Watchlog.content_id == Content.id)\
-            .filter(Watchlog.user_id == user_id, Content.type == "episode")\
-            .scalar()
+        # Une seule agrégation conditionnelle pour toutes les stats du user
+        activity = db.query(
+            func.count(Watchlog.id).label("total_watched"),
+            func.count(Watchlog.rating).label("total_rated"),
+            func.avg(Watchlog.rating).label("avg_rating"),
+            func.sum(case((Content.type == "movie", 1), else_=0)).label("movies_watched"),
+            func.sum(case((Content.type == "episode", 1), else_=0)).label("episodes_watched")
+        ).join(Content, Watchlog.content_id == Content.id)\
+         .filter(Watchlog.user_id == user_id)\
+         .one()
         
         return {
             "user_id": user_id,
             "username": user.username,
-            "total_watched": total_watched,
-            "total_rated": total_rated,
-            "avg_rating_given": round(avg_rating, 1) if avg_rating else None,
-            "movies_watched": movies_watched,
-            "episodes_watched": episodes_watched
+            "total_watched": activity.total_watched,
+            "total_rated": activity.total_rated,
+            "avg_rating_given": round(activity.avg_rating, 1) if activity.avg_rating else None,
+            "movies_watched": int(activity.movies_watched or 0),
+            "episodes_watched": int(activity.episodes_watched or 0)
         }
     finally:
         db.close()
@@ -124,25 +107,33 @@ def get_global_stats() -> dict:
     """Statistiques globales de Giorgio"""
     db = SessionLocal()
     try:
-        total_users = db.query(func.count(User.jellyfin_id)).scalar()
-        total_contents = db.query(func.count(Content.id)).scalar()
-        total_movies = db.query(func.count(Content.id)).filter(Content.type == "movie").scalar()
-        total_episodes = db.query(func.count(Content.id)).filter(Content.type == "episode").scalar()
-        total_watchlogs = db.query(func.count(Watchlog.id)).scalar()
-        total_ratings = db.query(func.count(Watchlog.id)).filter(Watchlog.rating.isnot(None)).scalar()
-        avg_rating = db.query(func.avg(Watchlog.rating)).filter(Watchlog.rating.isnot(None)).scalar()
+        # Catalogue (+ nombre d'utilisateurs en sous-requête) en une agrégation
+        catalog = db.query(
+            db.query(func.count(User.jellyfin_id)).scalar_subquery().label("users"),
+            func.count(Content.id).label("total"),
+            func.sum(case((Content.type == "movie", 1), else_=0)).label("movies"),
+            func.sum(case((Content.type == "episode", 1), else_=0)).label("episodes")
+        ).filter(Content.deleted_at.is_(None))\
+         .one()
+        
+        # Activité en une agrégation : COUNT(rating) et AVG(rating) ignorent les NULL
+        activity = db.query(
+            func.count(Watchlog.id).label("total_watches"),
+            func.count(Watchlog.rating).label("total_ratings"),
+            func.avg(Watchlog.rating).label("avg_rating")
+        ).one()
         
         return {
-            "users": total_users,
+            "users": catalog.users,
             "catalog": {
-                "total": total_contents,
-                "movies": total_movies,
-                "episodes": total_episodes
+                "total": catalog.total,
+                "movies": int(catalog.movies or 0),
+                "episodes": int(catalog.episodes or 0)
             },
             "activity": {
-                "total_watches": total_watchlogs,
-                "total_ratings": total_ratings,
-                "avg_rating": round(avg_rating, 1) if avg_rating else None
+                "total_watches": activity.total_watches,
+                "total_ratings": activity.total_ratings,
+                "avg_rating": round(activity.avg_rating, 1) if activity.avg_rating else None
             }
         }
     finally:
@@ -172,4 +163,72 @@ def get_recent_activity(limit: int = 10) -> list:
             for watchlog, user, content in results
         ]
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_genre_stats() -> list:
+    """Visionnages et note moyenne par genre (content_genres + content_stats, sans lire le JSON)"""
+    db = SessionLocal()
+    try:
+        results = db.query(
+            Genre.name,
+            func.count(ContentGenre.content_id).label("contents"),
+            func.coalesce(func.sum(ContentStats.watch_count), 0).label("watch_count"),
+            func.coalesce(func.sum(ContentStats.rating_count), 0).label("rating_count"),
+            func.coalesce(func.sum(ContentStats.rating_sum), 0).label("rating_sum")
+        ).join(ContentGenre, ContentGenre.genre_id == Genre.id)\
+         .outerjoin(ContentStats, ContentStats.content_id == ContentGenre.content_id)\
+         .group_by(Genre.id, Genre.name)\
+         .order_by(func.coalesce(func.sum(ContentStats.watch_count), 0).desc())\
+         .all()
+        
+        return [
+            {
+                "genre": r.name,
+                "contents": r.contents,
+                "watch_count": int(r.watch_count),
+                "rating_count": int(r.rating_count),
+                "avg_rating": round(r.rating_sum / r.rating_count, 1) if r.rating_count else None
+            }
+            for r in results
+        ]
+    finally:
+        db.close()
+
+
+def get_user_genre_stats(user_id: str) -> Optional[dict]:
+    """Visionnages et note moyenne donnée par genre pour un utilisateur"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.jellyfin_id == user_id).first()
+        if not user:
+            return None
+        
+        results = db.query(
+            Genre.name,
+            func.count(Watchlog.id).label("watch_count"),
+            func.count(Watchlog.rating).label("rating_count"),
+            func.avg(Watchlog.rating).label("avg_rating")
+        ).select_from(Watchlog)\
+         .join(ContentGenre, ContentGenre.content_id == Watchlog.content_id)\
+         .join(Genre, Genre.id == ContentGenre.genre_id)\
+         .filter(Watchlog.user_id == user_id)\
+         .group_by(Genre.id, Genre.name)\
+         .order_by(func.count(Watchlog.id).desc())\
+         .all()
+        
+        return {
+            "user_id": user_id,
+            "username": user.username,
+            "genres": [
+                {
+                    "genre": r.name,
+                    "watch_count": r.watch_count,
+                    "rating_count": r.rating_count,
+                    "avg_rating": round(r.avg_rating, 1) if r.avg_rating else None
+                }
+                for r in results
+            ]
+        }
+    finally:
+        db.close()
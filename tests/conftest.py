@@ -0,0 +1,43 @@
+"""
+Les tests tournent contre une vraie base MariaDB : l'ordre d'évaluation du SET
+et les collations sont justement ce qu'on vérifie. Base dédiée obligatoire (DB_NAME en *_test).
+"""
+import os
+
+os.environ.setdefault("DB_NAME", "giorgio_test")
+os.environ.setdefault("DB_PASSWORD", "giorgio")
+os.environ.setdefault("DB_ROOT_PASSWORD", "giorgio")
+os.environ.setdefault("DISCORD_BOT_TOKEN", "test")
+os.environ.setdefault("DISCORD_CHANNEL_ID", "0")
+os.environ.setdefault("JELLYFIN_URL", "http://jellyfin.test")
+os.environ.setdefault("JELLYFIN_API_KEY", "test")
+
+import pytest
+
+from config.settings import settings
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not settings.db_name.endswith("_test"):
+        pytest.skip("DB_NAME must end with _test: the tests empty every table")
+
+    from src.models.database import Base, engine, init_db
+    try:
+        init_db()
+    except Exception as e:
+        pytest.skip(f"MariaDB unavailable: {e}")
+    return Base, engine
+
+
+@pytest.fixture
+def db(database):
+    """Tables vidées avant chaque test"""
+    from src.services.cache import stats_cache
+
+    Base, engine = database
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    stats_cache.clear()
+    yield engine
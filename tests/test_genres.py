@@ -0,0 +1,31 @@
+import pytest
+
+# Driver absent : rien à tester sans MariaDB
+pytest.importorskip("mariadb")
+
+from src.models.database import SessionLocal, Genre, ContentGenre
+from src.services import database_service
+
+
+def _genres_of(content_id: str) -> set[int]:
+    db = SessionLocal()
+    try:
+        return {genre_id for (genre_id,) in db.query(ContentGenre.genre_id).filter(ContentGenre.content_id == content_id)}
+    finally:
+        db.close()
+
+
+def test_accent_and_case_variants_share_a_genre(db):
+    database_service.get_or_create_content("content-1", "Amélie", "movie", genres=["Comédie", "Sci-Fi"])
+    # Variantes repliées par utf8mb4_general_ci, y compris dans une même liste
+    database_service.get_or_create_content("content-2", "Brazil", "movie", genres=["comedie", "COMÉDIE", "sci-fi"])
+    database_service.get_or_create_content("content-3", "Playtime", "movie", genres=["Comedie "])
+
+    session = SessionLocal()
+    try:
+        assert session.query(Genre).count() == 2
+    finally:
+        session.close()
+    assert _genres_of("content-1") == _genres_of("content-2")
+    assert len(_genres_of("content-2")) == 2
+    assert _genres_of("content-3") < _genres_of("content-1")
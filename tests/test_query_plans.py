@@ -0,0 +1,66 @@
+import pytest
+
+# Driver absent : rien à tester sans MariaDB
+pytest.importorskip("mariadb")
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from src.models.database import User, Watchlog
+from src.services import database_service
+from src.services.query_plans import explain_stats_queries
+
+USERS = 50
+MOVIES = 1500
+EPISODES = 1500
+WATCHLOGS = 20000
+GENRES = ["Action", "Comédie", "Drame", "Sci-Fi", "Horreur", "Animation"]
+
+
+@pytest.fixture
+def seeded(db):
+    """Assez de lignes pour que l'optimiseur préfère les index à un parcours complet"""
+    with db.begin() as conn:
+        conn.execute(insert(User), [{"jellyfin_id": f"user-{i}", "username": f"user{i}"} for i in range(USERS)])
+    
+    rows = [
+        {
+            "id": f"{content_type}-{i}",
+            "title": f"{content_type.title()} {i}",
+            "type": content_type,
+            "year": 1950 + i % 75,
+            "genres": [GENRES[i % len(GENRES)], GENRES[(i * 7) % len(GENRES)]],
+            "tmdb_id": None,
+            "length": 90
+        }
+        for content_type, count in (("movie", MOVIES), ("episode", EPISODES))
+        for i in range(count)
+    ]
+    for i in range(0, len(rows), 500):
+        database_service.bulk_upsert_contents(rows[i:i + 500])
+    
+    started = datetime.utcnow() - timedelta(days=365)
+    with db.begin() as conn:
+        conn.execute(insert(Watchlog), [
+            {
+                "user_id": f"user-{i % USERS}",
+                "content_id": rows[(i * 13) % len(rows)]["id"],
+                "watched_at": started + timedelta(minutes=25 * i),
+                "rating": i % 10 + 1 if i % 3 else None
+            }
+            for i in range(WATCHLOGS)
+        ])
+    database_service.rebuild_content_stats()
+    
+    with db.begin() as conn:
+        conn.execute(text("ANALYZE TABLE users, contents, genres, content_genres, watchlogs, content_stats"))
+    return db
+
+
+def test_stats_queries_use_indexes(seeded):
+    report = explain_stats_queries()
+
+    assert {row["query"] for row in report} >= {"global_stats", "most_watched", "top_rated", "user_stats", "genre_stats"}
+    full_scans = [row for row in report if row["full_scan"]]
+    assert not full_scans, full_scans
@@ -0,0 +1,59 @@
+import pytest
+
+# Driver absent : rien à tester sans MariaDB
+pytest.importorskip("mariadb")
+
+from src.models.database import SessionLocal, ContentStats
+from src.services import database_service
+
+
+def _watchlogs(count: int, content_id: str = "content-1") -> list[int]:
+    database_service.get_or_create_content(content_id, "Heat", "movie", genres=["Action"])
+    ids = []
+    for i in range(count):
+        database_service.get_or_create_user(f"user-{i}", f"user{i}")
+        ids.append(database_service.create_watchlog(f"user-{i}", content_id).id)
+    return ids
+
+
+def _stats(content_id: str = "content-1") -> ContentStats:
+    db = SessionLocal()
+    try:
+        return db.query(ContentStats).filter(ContentStats.content_id == content_id).one()
+    finally:
+        db.close()
+
+
+def test_sequential_ratings_average(db):
+    first, second = _watchlogs(2)
+
+    database_service.update_rating(first, 8)
+    assert _stats().avg_rating == 8.0
+
+    database_service.update_rating(second, 4)
+    stats = _stats()
+    assert (stats.rating_count, stats.rating_sum) == (2, 12)
+    assert stats.avg_rating == 6.0
+
+
+def test_changed_rating_average(db):
+    (watchlog_id,) = _watchlogs(1)
+
+    database_service.update_rating(watchlog_id, 8)
+    database_service.update_rating(watchlog_id, 4)
+
+    stats = _stats()
+    assert (stats.rating_count, stats.rating_sum) == (1, 4)
+    assert stats.avg_rating == 4.0
+
+
+def test_batched_ratings_average(db):
+    first, second, third = _watchlogs(3)
+    database_service.update_rating(first, 8)
+
+    # Même contenu plusieurs fois dans le lot, dont une note modifiée
+    assert database_service.update_ratings({first: 4, second: 6, third: 10}) == 3
+
+    stats = _stats()
+    assert (stats.rating_count, stats.rating_sum) == (3, 20)
+    assert stats.avg_rating == pytest.approx(20 / 3, abs=1e-3)